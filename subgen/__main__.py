@@ -2,23 +2,41 @@ from __future__ import annotations
 
 import argparse
 import os
+import queue
 import sys
-from typing import Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 from .config import Config
-from .media import start_ffmpeg_pcm
-from .subtitles import format_srt, normalize_text, parse_srt
-from .transcribe import transcribe_pcm
+from .library import scan_media
+from .media import produce_pcm_chunks, start_ffmpeg_pcm
+from .net import create_session
+from .subtitles import normalize_text, parse_srt, read_subtitle_text, write_srt
+from .transcribe import SILENCE_RMS, pcm_rms, transcribe_pcm
 from .translate import translate_segments
 
 
 BYTES_PER_SAMPLE = 2  # s16le
+CHUNK_QUEUE_SIZE = 2
 
 
 def parse_args() -> Config:
     parser = argparse.ArgumentParser(description="Generate SRT subtitles from a video file.")
-    parser.add_argument("--input", required=True, help="Path to input video file.")
-    parser.add_argument("--output", required=True, help="Path to output SRT file.")
+    parser.add_argument("--input", default=None, help="Path to input video file.")
+    parser.add_argument("--output", default=None, help="Path to output SRT file.")
+    parser.add_argument(
+        "--library",
+        default=None,
+        help="Transcribe every video under this directory instead of --input/--output.",
+    )
+    parser.add_argument(
+        "--max-parallel",
+        type=int,
+        default=2,
+        help="Number of files transcribed concurrently with --library.",
+    )
     parser.add_argument("--endpoint", required=True, help="STT server base URL.")
     parser.add_argument("--api-key", default=None, help="Optional API key for STT server.")
     parser.add_argument("--lang", default="en", help="Language code for transcription (default: en).")
@@ -40,8 +58,8 @@ def parse_args() -> Config:
     parser.add_argument(
         "--translate-batch-size",
         type=int,
-        default=30,
-        help="Number of subtitle lines per translation batch.",
+        default=128,
+        help="Maximum subtitle lines per translation batch (Google caps this at 128).",
     )
     parser.add_argument(
         "--force-stt",
@@ -50,20 +68,38 @@ def parse_args() -> Config:
     )
     parser.add_argument("--chunk-seconds", type=int, default=30, help="Chunk size in seconds.")
     parser.add_argument("--overlap-seconds", type=int, default=3, help="Overlap size in seconds.")
+    parser.add_argument(
+        "--batch-chunks",
+        type=int,
+        default=4,
+        help="Number of chunks sent to the STT server concurrently.",
+    )
     parser.add_argument("--sample-rate", type=int, default=16000, help="Audio sample rate.")
     parser.add_argument("--timeout", type=int, default=120, help="HTTP timeout in seconds.")
+    parser.add_argument(
+        "--silence-rms",
+        type=float,
+        default=SILENCE_RMS,
+        help="Skip chunks whose int16 RMS is below this level (0 disables).",
+    )
     args = parser.parse_args()
 
+    if not args.library and not (args.input and args.output):
+        parser.error("--input and --output are required unless --library is used")
+    if args.max_parallel <= 0:
+        parser.error("--max-parallel must be > 0")
     if args.chunk_seconds <= 0:
         parser.error("--chunk-seconds must be > 0")
     if args.overlap_seconds < 0:
         parser.error("--overlap-seconds must be >= 0")
     if args.overlap_seconds >= args.chunk_seconds:
         parser.error("--overlap-seconds must be smaller than --chunk-seconds")
+    if args.batch_chunks <= 0:
+        parser.error("--batch-chunks must be > 0")
 
     return Config(
-        input_path=args.input,
-        output_path=args.output,
+        input_path=args.input or "",
+        output_path=args.output or "",
         endpoint=args.endpoint,
         api_key=args.api_key,
         language=args.lang,
@@ -74,12 +110,22 @@ def parse_args() -> Config:
         force_stt=args.force_stt,
         chunk_seconds=args.chunk_seconds,
         overlap_seconds=args.overlap_seconds,
+        batch_chunks=args.batch_chunks,
         sample_rate=args.sample_rate,
         timeout=args.timeout,
+        library_dir=args.library,
+        max_parallel=args.max_parallel,
+        silence_rms=args.silence_rms,
     )
 
 
-def _segment_from_result(segment: Dict[str, object], offset: float, overlap_seconds: float) -> Dict[str, object] | None:
+class _Segment(NamedTuple):
+    start: float
+    end: float
+    text: str
+
+
+def _segment_from_result(segment: Dict[str, object], offset: float, overlap_seconds: float) -> _Segment | None:
     start = float(segment.get("start", 0.0))
     end = float(segment.get("end", 0.0))
     text = str(segment.get("text", "")).strip()
@@ -91,23 +137,7 @@ def _segment_from_result(segment: Dict[str, object], offset: float, overlap_seco
         start = overlap_seconds
     if end <= start:
         return None
-    return {
-        "start": start + offset,
-        "end": end + offset,
-        "text": text,
-    }
-
-
-def _read_chunk(reader, size: int) -> bytes:
-    remaining = size
-    chunks: List[bytes] = []
-    while remaining > 0:
-        data = reader.read(remaining)
-        if not data:
-            break
-        chunks.append(data)
-        remaining -= len(data)
-    return b"".join(chunks)
+    return _Segment(start + offset, end + offset, text)
 
 
 def _translation_output_path(output_path: str, target_lang: str) -> str:
@@ -119,6 +149,44 @@ def _translation_output_path(output_path: str, target_lang: str) -> str:
 
 def main() -> int:
     config = parse_args()
+    if config.library_dir:
+        return process_library(config)
+    return transcribe_file(config)
+
+
+def process_library(config: Config) -> int:
+    if not os.path.isdir(config.library_dir or ""):
+        print(f"Library directory not found: {config.library_dir}", file=sys.stderr)
+        return 1
+    items = scan_media(str(config.library_dir))
+    print(f"Found {len(items)} videos in {config.library_dir}")
+
+    def run(item: Dict[str, object]) -> int:
+        input_path = str(item.get("path", ""))
+        stem, _ = os.path.splitext(input_path)
+        file_config = replace(
+            config,
+            input_path=input_path,
+            output_path=f"{stem}.gen_{config.language}.srt",
+            library_dir=None,
+        )
+        try:
+            return transcribe_file(file_config)
+        except Exception as exc:
+            print(f"Failed to process {input_path}: {exc}", file=sys.stderr)
+            return 1
+
+    # Each file already pipelines its own chunks, so the STT server sees max_parallel * batch_chunks requests.
+    with ThreadPoolExecutor(max_workers=config.max_parallel) as executor:
+        results = list(executor.map(run, items))
+    failed = sum(1 for code in results if code != 0)
+    if failed:
+        print(f"{failed}/{len(results)} files failed.", file=sys.stderr)
+        return 1
+    return 0
+
+
+def transcribe_file(config: Config) -> int:
     if not os.path.exists(config.input_path):
         print(f"Input file not found: {config.input_path}", file=sys.stderr)
         return 1
@@ -128,8 +196,7 @@ def main() -> int:
 
     segments: List[Dict[str, object]] = []
     if os.path.exists(config.output_path) and not config.force_stt:
-        with open(config.output_path, "r", encoding="utf-8") as handle:
-            segments = parse_srt(handle.read())
+        segments = parse_srt(read_subtitle_text(config.output_path, errors="strict"))
         if not segments:
             print("Existing SRT was empty; rerun with --force-stt.", file=sys.stderr)
             return 1
@@ -142,54 +209,89 @@ def main() -> int:
             print("ffmpeg did not provide stdout.", file=sys.stderr)
             return 1
 
-        chunk_index = 0
-        overlap_tail = b""
+        chunk_queue: "queue.Queue[Optional[Tuple[int, bytes, bool]]]" = queue.Queue(maxsize=CHUNK_QUEUE_SIZE)
+        producer = threading.Thread(
+            target=produce_pcm_chunks,
+            args=(process.stdout, chunk_bytes, overlap_bytes, chunk_queue),
+            daemon=True,
+        )
+        producer.start()
+
         last_norm = ""
+        last_norm_hash = hash(last_norm)
         last_end = 0.0
+        exhausted = False
+
+        try:
+            with create_session(config.batch_chunks) as session, ThreadPoolExecutor(
+                max_workers=config.batch_chunks
+            ) as executor:
+                while not exhausted:
+                    batch: List[Tuple[bytes, float, float]] = []
+                    while len(batch) < config.batch_chunks:
+                        item = chunk_queue.get()
+                        if item is None:
+                            exhausted = True
+                            break
+                        chunk_index, payload, has_overlap = item
+                        if config.silence_rms > 0 and pcm_rms(payload) < config.silence_rms:
+                            continue
+                        overlap_used = config.overlap_seconds if has_overlap else 0
+                        offset = max(chunk_index * config.chunk_seconds - overlap_used, 0)
+                        batch.append((payload, offset, overlap_used))
 
-        while True:
-            chunk = _read_chunk(process.stdout, chunk_bytes)
-            if not chunk:
-                break
-
-            payload = overlap_tail + chunk if overlap_tail else chunk
-            overlap_used = config.overlap_seconds if overlap_tail else 0
-            offset = max(chunk_index * config.chunk_seconds - overlap_used, 0)
-
-            result = transcribe_pcm(
-                config.endpoint,
-                payload,
-                config.sample_rate,
-                language=config.language,
-                api_key=config.api_key,
-                timeout=config.timeout,
-            )
-            for seg in result.get("segments", []):
-                prepared = _segment_from_result(seg, offset, overlap_used)
-                if not prepared:
-                    continue
-                norm = normalize_text(str(prepared["text"]))
-                if norm and norm == last_norm and prepared["start"] <= last_end + 0.1:
-                    continue
-                segments.append(prepared)
-                last_norm = norm
-                last_end = float(prepared["end"])
-
-            overlap_tail = (
-                chunk[-overlap_bytes:] if overlap_bytes and len(chunk) >= overlap_bytes else chunk
-            )
-            chunk_index += 1
+                    futures = [
+                        executor.submit(
+                            transcribe_pcm,
+                            config.endpoint,
+                            payload,
+                            config.sample_rate,
+                            language=config.language,
+                            api_key=config.api_key,
+                            timeout=config.timeout,
+                            session=session,
+                        )
+                        for payload, _, _ in batch
+                    ]
+                    # Merge in submission order so cross-chunk dedupe sees segments chronologically.
+                    for (_, offset, overlap_used), future in zip(batch, futures):
+                        result = future.result()
+                        for seg in result.get("segments", []):
+                            prepared = _segment_from_result(seg, offset, overlap_used)
+                            if not prepared:
+                                continue
+                            norm = normalize_text(prepared.text)
+                            norm_hash = hash(norm)
+                            # Integer compare first; the string compare only runs on a hash match.
+                            if (
+                                norm_hash == last_norm_hash
+                                and norm
+                                and norm == last_norm
+                                and prepared.start <= last_end + 0.1
+                            ):
+                                continue
+                            segments.append(prepared._asdict())
+                            last_norm = norm
+                            last_norm_hash = norm_hash
+                            last_end = prepared.end
+        except BaseException:
+            process.kill()
+            # The producer may be blocked on a full queue; once the killed pipe hits EOF it posts None and exits.
+            while not exhausted:
+                exhausted = chunk_queue.get() is None
+            producer.join()
+            process.communicate()
+            raise
 
+        producer.join()
         stdout, stderr = process.communicate()
         if process.returncode not in (0, None):
             detail = (stderr or b"").decode("utf-8", errors="ignore").strip()
             print(f"ffmpeg failed: {detail}", file=sys.stderr)
             return 1
 
-        srt = format_srt(segments)
         os.makedirs(os.path.dirname(config.output_path) or ".", exist_ok=True)
-        with open(config.output_path, "w", encoding="utf-8") as handle:
-            handle.write(srt)
+        write_srt(config.output_path, segments)
         print(f"Wrote {len(segments)} segments to {config.output_path}")
 
     if config.translate_to:
@@ -202,11 +304,9 @@ def main() -> int:
             batch_size=config.translate_batch_size,
             timeout=config.timeout,
         )
-        translated_srt = format_srt(translated)
         translated_path = _translation_output_path(config.output_path, config.translate_to)
         os.makedirs(os.path.dirname(translated_path) or ".", exist_ok=True)
-        with open(translated_path, "w", encoding="utf-8") as handle:
-            handle.write(translated_srt)
+        write_srt(translated_path, translated)
         print(f"Wrote translated SRT to {translated_path}")
 
     return 0
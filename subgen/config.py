@@ -18,5 +18,9 @@ class Config:
     force_stt: bool
     chunk_seconds: int
     overlap_seconds: int
+    batch_chunks: int
     sample_rate: int
     timeout: int
+    library_dir: Optional[str]
+    max_parallel: int
+    silence_rms: float
@@ -3,17 +3,54 @@ from __future__ import annotations
 import hashlib
 import json
 import os
+import re
+import stat
 import subprocess
+import tempfile
 import threading
 import time
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
 
-VIDEO_EXTENSIONS = {".mkv", ".mp4", ".avi", ".mov", ".m4v", ".webm"}
-SUBTITLE_EXTENSIONS = {".srt", ".vtt", ".ass", ".ssa", ".sub"}
+from .subtitles import NEW_FILE_MODE
+
+VIDEO_EXTENSIONS = frozenset({".mkv", ".mp4", ".avi", ".mov", ".m4v", ".webm"})
+SUBTITLE_EXTENSIONS = frozenset({".srt", ".vtt", ".ass", ".ssa", ".sub"})
+_VIDEO_SUFFIXES = tuple(sorted(VIDEO_EXTENSIONS))
+_SUBTITLE_SUFFIXES = tuple(sorted(SUBTITLE_EXTENSIONS))
 INDEX_FILENAME = "subgen.json"
+# Delta scans append to "<index>.jsonl"; the snapshot is rewritten once the journal is this many times its size.
+JOURNAL_COMPACT_RATIO = 2
+# Leading separators, optional "gen_" marker, then everything up to the next dot.
+_SIDECAR_LANG_RE = re.compile(r"[.\- _]*(?:gen_)*([^.]*)")
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+_PROBE_CACHE: Optional[Dict[str, Dict[str, object]]] = None
+_PROBE_CACHE_DIRTY = False
+_PROBE_CACHE_LOCK = threading.Lock()
+
+# describe_media_cached entries; the key carries the file and folder stamps, the TTL bounds anything else.
+DESCRIBE_CACHE_SIZE = 512
+DESCRIBE_CACHE_TTL = 120.0
+_DESCRIBE_CACHE: "OrderedDict[Tuple[str, int, int, int], Tuple[float, Dict[str, object]]]" = OrderedDict()
+_DESCRIBE_CACHE_LOCK = threading.Lock()
+
+# Journal appends, journal rotation and snapshot writes for an index all serialize on one lock.
+_INDEX_LOCK = threading.Lock()
+_INDEX_GENERATION = 0
+_INDEX_WRITTEN: Dict[Path, int] = {}
+_PENDING_INDEX_WRITES: Dict[Path, Tuple[int, List[Dict[str, object]], List[Path]]] = {}
+_INDEX_WRITE_COND = threading.Condition()
+_INDEX_WRITER: Optional[threading.Thread] = None
 
 
 def scan_media(
@@ -22,31 +59,7 @@ def scan_media(
     should_cancel: Optional[Callable[[], bool]] = None,
 ) -> List[Dict[str, object]]:
     base_path = Path(base_dir).resolve()
-    items: List[Dict[str, object]] = []
-    total_files = _count_files(base_path)
-    scanned_files = 0
-    scanned_videos = 0
-    for root, _, files in os.walk(base_path):
-        if should_cancel and should_cancel():
-            raise RuntimeError("Job canceled.")
-        for name in files:
-            if should_cancel and should_cancel():
-                raise RuntimeError("Job canceled.")
-            path = Path(root) / name
-            scanned_files += 1
-            is_video = path.suffix.lower() in VIDEO_EXTENSIONS
-            if is_video:
-                scanned_videos += 1
-                items.append(describe_media(path))
-            if progress_callback:
-                progress_callback(
-                    {
-                        "total_files": total_files,
-                        "scanned_files": scanned_files,
-                        "scanned_videos": scanned_videos,
-                        "current_file": str(path),
-                    }
-                )
+    items = _describe_tree(base_path, progress_callback, should_cancel)
     return sorted(items, key=lambda item: str(item.get("title", "")).lower())
 
 
@@ -63,14 +76,19 @@ def scan_media_with_index(
     resolved_index_path = _resolve_index_path(base_path, index_path)
 
     indexed_items = _load_index_items(resolved_index_path)
-    for item in seed_items or []:
-        if isinstance(item, dict):
-            indexed_items.append(item)
     indexed_map: Dict[str, Dict[str, object]] = {}
     for item in indexed_items:
         path = str(item.get("path", ""))
         if path:
             indexed_map[path] = item
+    unsaved: List[Dict[str, object]] = []
+    for item in seed_items or []:
+        if isinstance(item, dict):
+            path = str(item.get("path", ""))
+            if path and path not in indexed_map:
+                unsaved.append(item)
+            if path:
+                indexed_map[path] = item
 
     if full_scan:
         items = scan_media(
@@ -82,58 +100,102 @@ def scan_media_with_index(
             _save_index_items(resolved_index_path, items)
         return items
 
-    items = list(indexed_map.values())
-    total_files = _count_files(base_path)
-    scanned_files = 0
-    scanned_videos = len(items)
-    for root, _, files in os.walk(base_path):
+    seen: Set[str] = set()
+    new_items = _describe_tree(base_path, progress_callback, should_cancel, known=indexed_map, seen=seen)
+    removed = [path for path in indexed_map if path not in seen]
+    for path in removed:
+        del indexed_map[path]
+    for item in new_items:
+        indexed_map[str(item.get("path", ""))] = item
+    items_sorted = sorted(indexed_map.values(), key=lambda item: str(item.get("title", "")).lower())
+    # Only new, changed and removed items are written; the snapshot is rewritten once the journal outgrows it.
+    _append_index_items(resolved_index_path, unsaved + new_items, removed)
+    if _journal_needs_compaction(resolved_index_path):
+        _save_index_items(resolved_index_path, items_sorted)
+    return items_sorted
+
+
+def _describe_tree(
+    base_path: Path,
+    progress_callback: Optional[Callable[[Dict[str, object]], None]],
+    should_cancel: Optional[Callable[[], bool]],
+    known: Optional[Dict[str, Dict[str, object]]] = None,
+    seen: Optional[Set[str]] = None,
+) -> List[Dict[str, object]]:
+    known = known or {}
+    seen = set() if seen is None else seen
+    progress_lock = threading.Lock()
+    # The total is only known once the walk finishes; until then it is reported as None and walked_files
+    # (every file found so far) stands in as a provisional total.
+    counts: Dict[str, Optional[int]] = {"files": 0, "videos": len(known), "walked": 0, "total": None}
+
+    def report(file_path: str) -> None:
+        if progress_callback:
+            progress_callback(
+                {
+                    "total_files": counts["total"],
+                    "walked_files": counts["walked"],
+                    "scanned_files": counts["files"],
+                    "scanned_videos": counts["videos"],
+                    "current_file": file_path,
+                }
+            )
+
+    def advance(file_path: str, is_new_video: bool) -> None:
+        with progress_lock:
+            counts["files"] += 1
+            if is_new_video:
+                counts["videos"] += 1
+            report(file_path)
+
+    def probe(file_path: str, sidecars: List[Tuple[str, str]]) -> Dict[str, object]:
         if should_cancel and should_cancel():
             raise RuntimeError("Job canceled.")
-        for name in files:
+        item = describe_media(Path(file_path), sidecars)
+        advance(file_path, True)
+        return item
+
+    def refresh(file_path: str, sidecars: List[Tuple[str, str]]) -> Optional[Dict[str, object]]:
+        if should_cancel and should_cancel():
+            raise RuntimeError("Job canceled.")
+        # Known files are only re-described when their (mtime, size) no longer matches the indexed item.
+        item = None if _item_is_current(known[file_path], file_path) else describe_media(Path(file_path), sidecars)
+        advance(file_path, False)
+        return item
+
+    # ffprobe startup dominates describe_media, so oversubscribe the CPU count.
+    executor = ThreadPoolExecutor(max_workers=SCAN_WORKERS)
+    futures: List[Future] = []
+    try:
+        walked = 0
+        walked_videos: Set[str] = set()
+        for files in _walk_files(str(base_path)):
             if should_cancel and should_cancel():
                 raise RuntimeError("Job canceled.")
-            path = Path(root) / name
-            scanned_files += 1
-            if path.suffix.lower() not in VIDEO_EXTENSIONS:
-                if progress_callback:
-                    progress_callback(
-                        {
-                            "total_files": total_files,
-                            "scanned_files": scanned_files,
-                            "scanned_videos": scanned_videos,
-                            "current_file": str(path),
-                        }
-                    )
-                continue
-            normalized = str(path.resolve())
-            if normalized in indexed_map:
-                if progress_callback:
-                    progress_callback(
-                        {
-                            "total_files": total_files,
-                            "scanned_files": scanned_files,
-                            "scanned_videos": scanned_videos,
-                            "current_file": str(path),
-                        }
-                    )
-                continue
-            described = describe_media(path)
-            indexed_map[normalized] = described
-            items.append(described)
-            scanned_videos += 1
-            if progress_callback:
-                progress_callback(
-                    {
-                        "total_files": total_files,
-                        "scanned_files": scanned_files,
-                        "scanned_videos": scanned_videos,
-                        "current_file": str(path),
-                    }
-                )
-
-    items_sorted = sorted(items, key=lambda item: str(item.get("title", "")).lower())
-    _save_index_items(resolved_index_path, items_sorted)
-    return items_sorted
+            walked += len(files)
+            with progress_lock:
+                counts["walked"] = walked
+            sidecars = _sidecar_listing(files)
+            for file_path, name in files:
+                # Keys are walked paths under the resolved base_path, matching what describe_media stores.
+                if not name.lower().endswith(_VIDEO_SUFFIXES):
+                    advance(file_path, False)
+                    continue
+                walked_videos.add(file_path)
+                if file_path in known:
+                    seen.add(file_path)
+                    futures.append(executor.submit(refresh, file_path, sidecars))
+                else:
+                    futures.append(executor.submit(probe, file_path, sidecars))
+        with progress_lock:
+            counts["total"] = walked
+        items = [item for item in (future.result() for future in futures) if item is not None]
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    with progress_lock:
+        report("")
+    _save_probe_cache(base_path, walked_videos)
+    return items
 
 
 def save_media_index(
@@ -154,10 +216,16 @@ def load_media_index(base_dir: str, index_path: Optional[str] = None) -> List[Di
     return sorted(items, key=lambda item: str(item.get("title", "")).lower())
 
 
-def describe_media(path: Path) -> Dict[str, object]:
-    embedded = probe_embedded_subs(path)
-    sidecar = find_sidecar_subs(path)
-    title = probe_nfo_title(path) or probe_title(path) or path.stem
+def describe_media(path: Path, sidecar_listing: Optional[List[Tuple[str, str]]] = None) -> Dict[str, object]:
+    embedded, probed_title = _cached_probe_media(path)
+    sidecar = find_sidecar_subs(path, sidecar_listing)
+    title = probe_nfo_title(path) or probed_title or path.stem
+    try:
+        stat = path.stat()
+        mtime_ns: Optional[int] = stat.st_mtime_ns
+        size: Optional[int] = stat.st_size
+    except OSError:
+        mtime_ns = size = None
     return {
         "id": _hash_id(str(path)),
         "path": str(path),
@@ -166,17 +234,43 @@ def describe_media(path: Path) -> Dict[str, object]:
         "embedded_subs": embedded,
         "sidecar_subs": sidecar,
         "has_subs": bool(embedded or sidecar),
+        "mtime_ns": mtime_ns,
+        "size": size,
     }
 
 
-def probe_embedded_subs(path: Path) -> List[Dict[str, object]]:
+def describe_media_cached(path: Path) -> Dict[str, object]:
+    # The UI re-describes the same file on every click; the folder mtime changes when a sidecar is added.
+    try:
+        file_stat = path.stat()
+        dir_stat = path.parent.stat()
+    except OSError:
+        return describe_media(path)
+    key = (str(path), file_stat.st_mtime_ns, file_stat.st_size, dir_stat.st_mtime_ns)
+    now = time.monotonic()
+    with _DESCRIBE_CACHE_LOCK:
+        entry = _DESCRIBE_CACHE.get(key)
+        if entry and now - entry[0] < DESCRIBE_CACHE_TTL:
+            _DESCRIBE_CACHE.move_to_end(key)
+            return dict(entry[1])
+    item = describe_media(path)
+    with _DESCRIBE_CACHE_LOCK:
+        _DESCRIBE_CACHE[key] = (now, item)
+        _DESCRIBE_CACHE.move_to_end(key)
+        while len(_DESCRIBE_CACHE) > DESCRIBE_CACHE_SIZE:
+            _DESCRIBE_CACHE.popitem(last=False)
+    return dict(item)
+
+
+def probe_media(path: Path) -> Tuple[List[Dict[str, object]], Optional[str]]:
     cmd = [
         "ffprobe",
         "-v",
         "error",
         "-select_streams",
         "s",
-        "-show_streams",
+        "-show_entries",
+        "stream=index:stream_tags=language,title:format_tags=title",
         "-of",
         "json",
         str(path),
@@ -184,11 +278,11 @@ def probe_embedded_subs(path: Path) -> List[Dict[str, object]]:
     try:
         output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
     except subprocess.CalledProcessError:
-        return []
+        return [], None
     try:
         payload = json.loads(output.decode("utf-8", errors="ignore"))
     except json.JSONDecodeError:
-        return []
+        return [], None
     subs: List[Dict[str, object]] = []
     for stream in payload.get("streams", []):
         index = stream.get("index")
@@ -204,89 +298,196 @@ def probe_embedded_subs(path: Path) -> List[Dict[str, object]]:
                 "kind": "embedded",
             }
         )
-    return subs
+    format_tags = payload.get("format", {}).get("tags", {}) or {}
+    media_title = format_tags.get("title")
+    if isinstance(media_title, str) and media_title.strip():
+        return subs, media_title.strip()
+    return subs, None
 
 
-def probe_title(path: Path) -> Optional[str]:
-    cmd = [
-        "ffprobe",
-        "-v",
-        "error",
-        "-show_entries",
-        "format_tags=title",
-        "-of",
-        "json",
-        str(path),
-    ]
+def _cached_probe_media(path: Path) -> Tuple[List[Dict[str, object]], Optional[str]]:
+    # ffprobe output only depends on the file contents, so (mtime, size) is a sufficient key.
+    global _PROBE_CACHE_DIRTY
     try:
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-    except subprocess.CalledProcessError:
-        return None
+        stat = path.stat()
+    except OSError:
+        return probe_media(path)
+    key = str(path)
+    with _PROBE_CACHE_LOCK:
+        entry = _probe_cache().get(key)
+    if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+        subs = entry.get("subs")
+        title = entry.get("title")
+        if isinstance(subs, list) and (title is None or isinstance(title, str)):
+            return [dict(sub) for sub in subs if isinstance(sub, dict)], title
+    subs, title = probe_media(path)
+    with _PROBE_CACHE_LOCK:
+        _probe_cache()[key] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "subs": subs,
+            "title": title,
+        }
+        _PROBE_CACHE_DIRTY = True
+    return [dict(sub) for sub in subs], title
+
+
+def _item_is_current(item: Dict[str, object], file_path: str) -> bool:
+    # Compared against the index itself, which lives with the library, not the probe cache, which may not survive
+    # a container restart. Items indexed before the stat fields existed are re-described once.
+    if item.get("mtime_ns") is None or item.get("size") is None:
+        return False
     try:
-        payload = json.loads(output.decode("utf-8", errors="ignore"))
-    except json.JSONDecodeError:
-        return None
-    tags = payload.get("format", {}).get("tags", {}) or {}
-    title = tags.get("title")
-    if isinstance(title, str) and title.strip():
-        return title.strip()
-    return None
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    return item.get("mtime_ns") == stat.st_mtime_ns and item.get("size") == stat.st_size
+
+
+def _probe_cache_path() -> Optional[Path]:
+    # Resolved on use: Path.home() raises in containers without HOME or a passwd entry.
+    override = os.environ.get("SUBGEN_PROBE_CACHE_PATH")
+    if override:
+        return Path(override)
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if not cache_home:
+        try:
+            cache_home = str(Path.home() / ".cache")
+        except RuntimeError:
+            return None
+    return Path(cache_home) / "subgen" / "probe.json"
+
+
+def _probe_cache() -> Dict[str, Dict[str, object]]:
+    global _PROBE_CACHE
+    if _PROBE_CACHE is None:
+        _PROBE_CACHE = {}
+        cache_path = _probe_cache_path()
+        try:
+            payload = json.loads(cache_path.read_text(encoding="utf-8")) if cache_path else {}
+        except (OSError, json.JSONDecodeError):
+            payload = {}
+        entries = payload.get("entries", {}) if isinstance(payload, dict) else {}
+        if isinstance(entries, dict):
+            for key, entry in entries.items():
+                if isinstance(entry, dict):
+                    _PROBE_CACHE[str(key)] = entry
+    return _PROBE_CACHE
+
+
+def _save_probe_cache(base_path: Path, walked: Set[str]) -> None:
+    # Entries under base_path that the finished walk did not see belong to deleted or renamed files.
+    global _PROBE_CACHE_DIRTY
+    prefix = os.path.join(str(base_path), "")
+    with _PROBE_CACHE_LOCK:
+        if _PROBE_CACHE is None:
+            return
+        stale = [key for key in _PROBE_CACHE if key.startswith(prefix) and key not in walked]
+        for key in stale:
+            del _PROBE_CACHE[key]
+        cache_path = _probe_cache_path()
+        if not (_PROBE_CACHE_DIRTY or stale) or cache_path is None:
+            return
+        payload = {"version": 1, "entries": _PROBE_CACHE}
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(cache_path, _dump_json(payload))
+        except OSError as exc:
+            print(f"[subgen] probe cache write failed: {exc}")
+            return
+        _PROBE_CACHE_DIRTY = False
+
+
+def probe_embedded_subs(path: Path) -> List[Dict[str, object]]:
+    return probe_media(path)[0]
+
+
+def probe_title(path: Path) -> Optional[str]:
+    return probe_media(path)[1]
 
 
 def probe_nfo_title(path: Path) -> Optional[str]:
     candidates = [path.with_suffix(".nfo"), path.parent / "movie.nfo"]
     for nfo_path in candidates:
-        if not nfo_path.exists() or not nfo_path.is_file():
-            continue
         try:
-            tree = ET.parse(nfo_path)
-            root = tree.getroot()
-        except ET.ParseError:
+            st = os.stat(nfo_path)
+        except OSError:
             continue
-        title = root.findtext("title")
-        if isinstance(title, str) and title.strip():
-            return title.strip()
+        if not stat.S_ISREG(st.st_mode):
+            continue
+        # movie.nfo is shared by every file in the folder; mtime in the key picks up edits.
+        title = _parse_nfo_title(str(nfo_path), st.st_mtime_ns)
+        if title:
+            return title
     return None
 
 
-def find_sidecar_subs(path: Path) -> List[Dict[str, object]]:
+@lru_cache(maxsize=2048)
+def _parse_nfo_title(nfo_path: str, mtime_ns: int) -> Optional[str]:
+    depth = 0
+    try:
+        with open(nfo_path, "rb") as handle:
+            for event, elem in ET.iterparse(handle, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    continue
+                depth -= 1
+                # Stop at the root's own <title>; the rest of the file is never parsed.
+                if depth == 1 and elem.tag == "title":
+                    title = (elem.text or "").strip()
+                    return title or None
+    except (OSError, ET.ParseError):
+        return None
+    return None
+
+
+def find_sidecar_subs(path: Path, listing: Optional[List[Tuple[str, str]]] = None) -> List[Dict[str, object]]:
     base = path.stem
-    directory = path.parent
+    if listing is None:
+        # Name checks come first; is_file() only stats symlinks, d_type answers the rest.
+        listing = []
+        with os.scandir(path.parent) as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.startswith(base) or not name.lower().endswith(_SUBTITLE_SUFFIXES):
+                    continue
+                if entry.is_file():
+                    listing.append((entry.path, name))
     subs: List[Dict[str, object]] = []
-    for entry in directory.iterdir():
-        if not entry.is_file():
-            continue
-        if entry.suffix.lower() not in SUBTITLE_EXTENSIONS:
+    for entry_path, name in listing:
+        if not name.startswith(base):
             continue
-        if not entry.name.startswith(base):
-            continue
-        lang = _lang_from_filename(base, entry.name)
+        suffix = os.path.splitext(name)[1].lower()
+        lang = _lang_from_filename(base, name)
         subs.append(
             {
-                "id": f"sidecar:{entry}",
+                "id": f"sidecar:{entry_path}",
                 "lang": lang or "und",
-                "title": entry.name,
-                "path": str(entry),
-                "format": entry.suffix.lower().lstrip("."),
+                "title": name,
+                "path": entry_path,
+                "format": suffix.lstrip("."),
                 "kind": "sidecar",
             }
         )
     return subs
 
 
-def extract_embedded_sub(path: Path, stream_index: int, output_path: Path) -> None:
+def read_embedded_sub(path: Path, stream_index: int) -> str:
     cmd = [
         "ffmpeg",
-        "-y",
+        "-nostdin",
         "-i",
         str(path),
         "-map",
         f"0:{stream_index}",
         "-c:s",
         "srt",
-        str(output_path),
+        "-f",
+        "srt",
+        "pipe:1",
     ]
-    subprocess.check_call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+    return result.stdout.decode("utf-8", errors="ignore")
 
 
 def resolve_media_path(base_dir: str, requested: Optional[str]) -> str:
@@ -300,61 +501,247 @@ def resolve_media_path(base_dir: str, requested: Optional[str]) -> str:
 
 
 def _hash_id(value: str) -> str:
-    return hashlib.sha1(value.encode("utf-8")).hexdigest()
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=10).hexdigest()
 
 
 def _lang_from_filename(base: str, filename: str) -> Optional[str]:
     if not filename.startswith(base):
         return None
-    remainder = filename[len(base) :].lstrip(".- _")
-    if not remainder:
-        return None
-    parts = remainder.split(".")
-    if not parts:
-        return None
-    candidate = parts[0]
-    candidate = candidate.replace("gen_", "")
-    return candidate or None
+    match = _SIDECAR_LANG_RE.match(filename, len(base))
+    return (match.group(1) or None) if match else None
 
 
-def _count_files(base_path: Path) -> int:
-    total = 0
-    for _, _, files in os.walk(base_path):
-        total += len(files)
-    return total
+def _walk_files(directory: str) -> Iterator[List[Tuple[str, str]]]:
+    # Yields (path, name) files one directory at a time so sidecar listings are complete per batch.
+    # Mirrors os.walk defaults: unreadable directories are skipped and symlinked directories are not followed.
+    files: List[Tuple[str, str]] = []
+    subdirs: List[str] = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                    continue
+                files.append((entry.path, entry.name))
+    except OSError:
+        return
+    if files:
+        yield files
+    for subdir in subdirs:
+        yield from _walk_files(subdir)
+
+
+def _sidecar_listing(files: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    # Sidecar lookups share one listing per directory instead of re-reading it per video.
+    return [(file_path, name) for file_path, name in files if name.lower().endswith(_SUBTITLE_SUFFIXES)]
 
 
 def _load_index_items(index_path: Path) -> List[Dict[str, object]]:
-    if not index_path.exists() or not index_path.is_file():
-        return []
+    output: List[Dict[str, object]] = []
+    folded: Set[str] = set()
+    with _INDEX_LOCK:
+        if index_path.exists() and index_path.is_file():
+            try:
+                payload = json.loads(index_path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                payload = None
+            items = payload.get("items", []) if isinstance(payload, dict) else []
+            if isinstance(items, list):
+                for item in items:
+                    if isinstance(item, dict):
+                        output.append(item)
+            names = payload.get("folded", []) if isinstance(payload, dict) else []
+            if isinstance(names, list):
+                folded.update(str(name) for name in names)
+        # Rotated journals the snapshot did not fold (a crash before it was replaced) replay first, oldest first.
+        journal: List[Dict[str, object]] = []
+        for rotated in _rotated_journals(index_path):
+            if rotated.name not in folded:
+                journal.extend(_load_journal_items(rotated))
+        journal.extend(_load_journal_items(_journal_path(index_path)))
+    # Journal entries are newer than the snapshot; last one wins per path.
+    merged: Dict[str, Dict[str, object]] = {}
+    for item in output + journal:
+        if "removed" in item:
+            merged.pop(str(item["removed"]), None)
+        else:
+            path = str(item.get("path", ""))
+            # Ids are re-derived so older sha1 ids never sit next to current ones; the next snapshot stores them.
+            item["id"] = _hash_id(path)
+            merged[path] = item
+    return list(merged.values())
+
+
+def _load_journal_items(journal_path: Path) -> List[Dict[str, object]]:
     try:
-        payload = json.loads(index_path.read_text(encoding="utf-8"))
-    except (OSError, json.JSONDecodeError):
-        return []
-    if not isinstance(payload, dict):
-        return []
-    items = payload.get("items", [])
-    if not isinstance(items, list):
+        with open(journal_path, "rb") as handle:
+            lines = handle.readlines()
+    except OSError:
         return []
     output: List[Dict[str, object]] = []
-    for item in items:
+    for line in lines:
+        try:
+            item = json.loads(line)
+        except ValueError:
+            # A crash mid-append leaves at most one torn line at the end.
+            continue
         if isinstance(item, dict):
             output.append(item)
     return output
 
 
+def _journal_path(index_path: Path) -> Path:
+    if index_path.suffix == ".jsonl":
+        return index_path.with_name(f"{index_path.name}.jsonl")
+    return index_path.with_suffix(".jsonl")
+
+
+def _rotated_journals(index_path: Path) -> List[Path]:
+    journal = _journal_path(index_path)
+    try:
+        names = os.listdir(journal.parent)
+    except OSError:
+        return []
+    prefix = f"{journal.name}."
+    # Rotated names carry a fixed-width time_ns stamp, so name order is rotation order.
+    return [journal.with_name(name) for name in sorted(names) if name.startswith(prefix) and name.endswith(".prev")]
+
+
+def _rotate_journal(index_path: Path) -> List[Path]:
+    journal = _journal_path(index_path)
+    try:
+        os.replace(journal, journal.with_name(f"{journal.name}.{time.time_ns()}.prev"))
+    except FileNotFoundError:
+        pass
+    return _rotated_journals(index_path)
+
+
+def _append_index_items(
+    index_path: Path,
+    items: List[Dict[str, object]],
+    removed: Iterable[str] = (),
+) -> None:
+    # Items are journaled as-is; a deleted file is recorded as {"removed": path}.
+    records = list(items) + [{"removed": path} for path in removed]
+    if not records:
+        return
+    data = b"".join(_dump_json(record) + b"\n" for record in records)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    with _INDEX_LOCK:
+        with open(_journal_path(index_path), "ab") as handle:
+            handle.write(data)
+
+
+def _journal_needs_compaction(index_path: Path) -> bool:
+    try:
+        journal_size = os.stat(_journal_path(index_path)).st_size
+    except OSError:
+        return False
+    try:
+        snapshot_size = os.stat(index_path).st_size
+    except OSError:
+        snapshot_size = 0
+    return journal_size > JOURNAL_COMPACT_RATIO * snapshot_size
+
+
 def _save_index_items(index_path: Path, items: List[Dict[str, object]], async_write: bool = False) -> None:
+    # Everything journaled up to now is folded into this snapshot; later appends start a fresh journal.
+    global _INDEX_GENERATION
+    with _INDEX_LOCK:
+        folded = _rotate_journal(index_path)
+        _INDEX_GENERATION += 1
+        generation = _INDEX_GENERATION
     if async_write:
-        thread = threading.Thread(target=_save_index_items, args=(index_path, items, False), daemon=True)
-        thread.start()
+        _queue_index_write(index_path, generation, items, folded)
         return
+    _write_index_snapshot(index_path, generation, items, folded)
+
+
+def _write_index_snapshot(
+    index_path: Path,
+    generation: int,
+    items: List[Dict[str, object]],
+    folded: List[Path],
+) -> None:
     payload = {
         "version": 1,
         "updated_at": int(time.time()),
         "items": items,
+        # Lets a load after a crash between the replace and the unlinks below skip journals already folded in.
+        "folded": [path.name for path in folded],
     }
+    data = _dump_json(payload)
     index_path.parent.mkdir(parents=True, exist_ok=True)
-    index_path.write_text(json.dumps(payload, ensure_ascii=True), encoding="utf-8")
+    with _INDEX_LOCK:
+        if _INDEX_WRITTEN.get(index_path, 0) > generation:
+            # A snapshot taken later has already landed.
+            return
+        _write_atomic(index_path, data)
+        _INDEX_WRITTEN[index_path] = generation
+        for path in folded:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def _queue_index_write(
+    index_path: Path,
+    generation: int,
+    items: List[Dict[str, object]],
+    folded: List[Path],
+) -> None:
+    # One long-lived writer; a newer snapshot for the same path replaces any that is still pending.
+    global _INDEX_WRITER
+    with _INDEX_WRITE_COND:
+        _PENDING_INDEX_WRITES[index_path] = (generation, items, folded)
+        if _INDEX_WRITER is None or not _INDEX_WRITER.is_alive():
+            _INDEX_WRITER = threading.Thread(target=_index_writer_loop, name="subgen-index-writer", daemon=True)
+            _INDEX_WRITER.start()
+        _INDEX_WRITE_COND.notify()
+
+
+def _index_writer_loop() -> None:
+    while True:
+        with _INDEX_WRITE_COND:
+            while not _PENDING_INDEX_WRITES:
+                _INDEX_WRITE_COND.wait()
+            index_path, (generation, items, folded) = _PENDING_INDEX_WRITES.popitem()
+        try:
+            _write_index_snapshot(index_path, generation, items, folded)
+        except OSError as exc:
+            print(f"[subgen] index write failed: {exc}")
+
+
+def _dump_json(payload: Dict[str, object]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=True).encode("utf-8")
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # Readers (and a crash mid-write) only ever see the old or the new file, never a partial one.
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        mode = NEW_FILE_MODE
+    fd, temp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.chmod(temp_name, mode)
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
 
 
 def _resolve_index_path(base_path: Path, index_path: Optional[str]) -> Path:
@@ -1,8 +1,46 @@
 from __future__ import annotations
 
+import queue
 import shutil
 import subprocess
-from typing import List
+import threading
+from typing import IO, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+PIPE_BUFFER_SIZE = 1 << 20
+
+
+class FFmpegProcess(subprocess.Popen):
+    """Popen that drains stderr in the background so a chatty ffmpeg never blocks on a full pipe."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._stderr_chunks: List[bytes] = []
+        self._stderr_thread: Optional[threading.Thread] = None
+        if self.stderr:
+            stderr, self.stderr = self.stderr, None
+            self._stderr_thread = threading.Thread(target=self._drain_stderr, args=(stderr,), daemon=True)
+            self._stderr_thread.start()
+
+    def _drain_stderr(self, stream: IO[bytes]) -> None:
+        with stream:
+            while True:
+                data = stream.read1()
+                if not data:
+                    break
+                self._stderr_chunks.append(data)
+
+    def communicate(self, input=None, timeout=None) -> Tuple[Optional[bytes], Optional[bytes]]:
+        stdout, _ = super().communicate(input, timeout)
+        if self._stderr_thread is None:
+            return stdout, None
+        self._stderr_thread.join(timeout)
+        return stdout, b"".join(self._stderr_chunks)
 
 
 def _ffmpeg_path() -> str:
@@ -33,8 +71,59 @@ def build_ffmpeg_pcm_cmd(input_path: str, sample_rate: int) -> List[str]:
 
 def start_ffmpeg_pcm(input_path: str, sample_rate: int) -> subprocess.Popen:
     cmd = build_ffmpeg_pcm_cmd(input_path, sample_rate)
-    return subprocess.Popen(
+    process = FFmpegProcess(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
+        bufsize=PIPE_BUFFER_SIZE,
     )
+    if process.stdout:
+        _grow_pipe(process.stdout.fileno(), PIPE_BUFFER_SIZE)
+    return process
+
+
+def _grow_pipe(fd: int, size: int) -> None:
+    # Linux only; the kernel caps this at /proc/sys/fs/pipe-max-size, so failures are non-fatal.
+    set_pipe_size = getattr(fcntl, "F_SETPIPE_SZ", None) if fcntl else None
+    if set_pipe_size is None:
+        return
+    try:
+        fcntl.fcntl(fd, set_pipe_size, size)
+    except OSError:
+        pass
+
+
+def produce_pcm_chunks(
+    reader: IO[bytes],
+    size: int,
+    overlap_bytes: int,
+    chunk_queue: "queue.Queue[Optional[Tuple[int, bytes, bool]]]",
+) -> None:
+    # Keep ffmpeg draining while the consumer is busy; puts (chunk_index, payload, has_overlap), then None at EOF.
+    buffer = bytearray(overlap_bytes + size)
+    view = memoryview(buffer)
+    chunk_index = 0
+    tail_len = 0
+    try:
+        while True:
+            filled = _read_into(reader, view[: tail_len + size], tail_len)
+            if filled == tail_len:
+                break
+            chunk_queue.put((chunk_index, bytes(view[:filled]), tail_len > 0))
+            # Slide the overlap to the front in place (memmove) for the next chunk.
+            tail_len = min(overlap_bytes, filled)
+            view[:tail_len] = view[filled - tail_len : filled]
+            chunk_index += 1
+    finally:
+        chunk_queue.put(None)
+
+
+def _read_into(reader: IO[bytes], view: memoryview, start: int = 0) -> int:
+    # Fill the caller's buffer in place; returns the end offset of valid data.
+    filled = start
+    while filled < len(view):
+        count = reader.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
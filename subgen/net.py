@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Rate limiting and gateway errors are transient on both the STT server and the translate APIs;
+# urllib3 honours Retry-After on 429/503.
+RETRY_STATUSES = (429, 502, 503, 504)
+
+_SESSIONS: Dict[str, requests.Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def create_session(pool_size: int = 8) -> requests.Session:
+    # Keep-alive connections so consecutive requests skip the TCP/TLS handshake.
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=0,
+        status=3,
+        backoff_factor=0.3,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size), max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def shared_session(url: str) -> requests.Session:
+    # One long-lived session per endpoint for callers that do not manage their own.
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(url)
+        if session is None:
+            session = create_session()
+            _SESSIONS[url] = session
+        return session
@@ -1,27 +1,51 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Dict
+import io
+import mmap
+import os
+import re
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, TextIO, Union
+
+# mkstemp creates files 0600; new files get the mode open(path, "w") would have given them under the umask.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+# Optional index line (any content, it is never used), "HH:MM:SS,mmm --> HH:MM:SS,mmm" line, then the cue
+# text up to the next blank line.
+_SRT_CUE_RE = re.compile(
+    r"^\ufeff?(?:([^\n]*)\n)?"
+    r"[^\S\n]*(\d+):(\d+):(\d+),(\d+)[^\S\n]*-->[^\S\n]*(\d+):(\d+):(\d+),(\d+)[^\n]*"
+    r"(.*?)(?=\n[^\S\n]*\n|\Z)",
+    re.MULTILINE | re.DOTALL,
+)
 
 
 def _format_timestamp(seconds: float) -> str:
     if seconds < 0:
         seconds = 0.0
-    millis = int(round(seconds * 1000.0))
-    hours = millis // 3_600_000
-    millis -= hours * 3_600_000
-    minutes = millis // 60_000
-    millis -= minutes * 60_000
-    secs = millis // 1000
-    millis -= secs * 1000
+    hours, millis = divmod(int(round(seconds * 1000.0)), 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
 
 
+@lru_cache(maxsize=1024)
 def normalize_text(text: str) -> str:
     return " ".join(text.strip().lower().split())
 
 
 def format_srt(segments: Iterable[Dict[str, object]]) -> str:
-    lines: List[str] = []
+    buffer = io.StringIO()
+    format_srt_to(buffer, segments)
+    return buffer.getvalue()
+
+
+def format_srt_to(handle: TextIO, segments: Iterable[Dict[str, object]]) -> int:
+    # Cues are written one at a time so long transcripts never exist as a single string.
     index = 1
     for segment in segments:
         start = float(segment.get("start", 0.0))
@@ -31,46 +55,69 @@ def format_srt(segments: Iterable[Dict[str, object]]) -> str:
             continue
         if end <= start:
             continue
-        lines.append(str(index))
-        lines.append(f"{_format_timestamp(start)} --> {_format_timestamp(end)}")
-        lines.append(text)
-        lines.append("")
+        if index > 1:
+            handle.write("\n")
+        handle.write(f"{index}\n{_format_timestamp(start)} --> {_format_timestamp(end)}\n{text}\n")
         index += 1
-    return "\n".join(lines).rstrip() + "\n"
+    if index == 1:
+        handle.write("\n")
+    return index - 1
 
 
-def parse_srt(text: str) -> List[Dict[str, object]]:
-    blocks = [block for block in text.split("\n\n") if block.strip()]
-    segments: List[Dict[str, object]] = []
-    for block in blocks:
-        lines = [line.strip() for line in block.splitlines() if line.strip()]
-        if len(lines) < 2:
-            continue
-        time_line = lines[1]
-        if "-->" not in time_line:
-            continue
-        start_raw, end_raw = [part.strip() for part in time_line.split("-->", 1)]
+def write_srt(path: Union[str, Path], segments: Iterable[Dict[str, object]]) -> int:
+    # A 1 MiB buffer keeps write() syscalls rare without holding the whole file in memory. The cues go to a
+    # temp file that replaces the target only once fsync'd, so players never pick up a half-written .srt.
+    path = Path(path)
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        mode = NEW_FILE_MODE
+    fd, temp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with open(fd, "w", encoding="utf-8", buffering=1 << 20) as handle:
+            count = format_srt_to(handle, segments)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(temp_name, mode)
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+def read_subtitle_text(path: Union[str, Path], errors: str = "ignore") -> str:
+    # Decode straight from the page cache; read_text() would first copy the whole file into a bytes object.
+    with open(path, "rb") as handle:
         try:
-            start = _parse_timestamp(start_raw)
-            end = _parse_timestamp(end_raw)
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
         except ValueError:
-            continue
-        text_lines = lines[2:] if len(lines) > 2 else []
-        segment_text = "\n".join(text_lines).strip()
+            # Empty files cannot be mapped.
+            return ""
+        except OSError:
+            # FUSE/rclone and some SMB mounts refuse mmap (ENODEV/EINVAL); read the file normally there.
+            return handle.read().decode("utf-8", errors)
+        with mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            return str(mapped, "utf-8", errors)
+
+
+def parse_srt(text: str) -> List[Dict[str, object]]:
+    segments: List[Dict[str, object]] = []
+    for match in _SRT_CUE_RE.finditer(text):
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, match.group(2, 3, 4, 5, 6, 7, 8, 9))
+        segment_text = "\n".join(line.strip() for line in match.group(10).splitlines() if line.strip())
         if not segment_text:
             continue
-        segments.append({"start": start, "end": end, "text": segment_text})
+        segments.append(
+            {
+                "start": h1 * 3600 + m1 * 60 + s1 + (ms1 / 1000.0),
+                "end": h2 * 3600 + m2 * 60 + s2 + (ms2 / 1000.0),
+                "text": segment_text,
+            }
+        )
     return segments
-
-
-def _parse_timestamp(value: str) -> float:
-    parts = value.split(",")
-    if len(parts) != 2:
-        raise ValueError("Invalid timestamp")
-    time_part, ms_part = parts
-    hours_str, minutes_str, seconds_str = time_part.split(":")
-    hours = int(hours_str)
-    minutes = int(minutes_str)
-    seconds = int(seconds_str)
-    millis = int(ms_part)
-    return hours * 3600 + minutes * 60 + seconds + (millis / 1000.0)
@@ -2,14 +2,28 @@ from __future__ import annotations
 
 import json
 import math
+import queue
 import subprocess
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
 
 import numpy as np
 import requests
 
+from .net import create_session, shared_session
 
+
+STT_PIPELINE_DEPTH = 2
+PCM_QUEUE_SIZE = 2
+# int16 RMS below this (about -56 dBFS) over a whole chunk is treated as silence and never sent to STT.
+SILENCE_RMS = 50.0
+
+
+@lru_cache(maxsize=32)
 def _normalize_endpoint(endpoint: str) -> str:
     endpoint = endpoint.rstrip("/")
     if endpoint.endswith("/transcribe"):
@@ -17,6 +31,18 @@ def _normalize_endpoint(endpoint: str) -> str:
     return f"{endpoint}/transcribe"
 
 
+@lru_cache(maxsize=32)
+def _stt_headers(sample_rate: int, language: str, api_key: Optional[str]) -> Dict[str, str]:
+    # Built once per job settings and shared read-only; requests merges it into a fresh dict per call.
+    headers = {
+        "X-Sample-Rate": str(sample_rate),
+        "X-Lang": language,
+    }
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+
 def transcribe_pcm(
     endpoint: str,
     pcm_bytes: bytes,
@@ -24,16 +50,11 @@ def transcribe_pcm(
     language: str = "en",
     api_key: Optional[str] = None,
     timeout: int = 60,
+    session: Optional[requests.Session] = None,
 ) -> Dict[str, Any]:
     url = _normalize_endpoint(endpoint)
-    headers = {
-        "X-Sample-Rate": str(sample_rate),
-        "X-Lang": language,
-    }
-    if api_key:
-        headers["Authorization"] = f"Bearer {api_key}"
-
-    response = requests.post(url, headers=headers, data=pcm_bytes, timeout=timeout)
+    headers = _stt_headers(sample_rate, language, api_key)
+    response = (session or shared_session(url)).post(url, headers=headers, data=pcm_bytes, timeout=timeout)
     if response.status_code >= 400:
         raise RuntimeError(f"STT error {response.status_code}: {response.text}")
 
@@ -46,6 +67,13 @@ def transcribe_pcm(
     return payload
 
 
+def pcm_rms(pcm_bytes: bytes) -> float:
+    samples = np.frombuffer(pcm_bytes, dtype=np.int16, count=len(pcm_bytes) // 2).astype(np.float32)
+    if not samples.size:
+        return 0.0
+    return math.sqrt(float(np.dot(samples, samples)) / samples.size)
+
+
 def transcribe_media(
     media_path: Path,
     endpoint: str,
@@ -56,10 +84,11 @@ def transcribe_media(
     sample_rate: int = 16000,
     timeout: int = 120,
     vad_threshold: float = 0.30,
+    stt_max_parallel: int = 4,
     progress_callback: Optional[Callable[[Dict[str, object]], None]] = None,
     should_cancel: Optional[Callable[[], bool]] = None,
 ) -> List[Dict[str, object]]:
-    from .media import start_ffmpeg_pcm
+    from .media import produce_pcm_chunks, start_ffmpeg_pcm
     from .subtitles import normalize_text
 
     bytes_per_sample = 2
@@ -84,125 +113,14 @@ def transcribe_media(
         raise RuntimeError("ffmpeg did not provide stdout.")
     total_chunks = _estimate_total_chunks(media_path, chunk_seconds)
 
-    def read_chunk(reader, size: int) -> bytes:
-        remaining = size
-        chunks: List[bytes] = []
-        while remaining > 0:
-            data = reader.read(remaining)
-            if not data:
-                break
-            chunks.append(data)
-            remaining -= len(data)
-        return b"".join(chunks)
-
     segments: List[Dict[str, object]] = []
-    chunk_index = 0
-    overlap_tail = b""
     last_norm = ""
+    last_norm_hash = hash(last_norm)
     last_end = 0.0
 
-    while True:
-        if should_cancel and should_cancel():
-            process.kill()
-            process.communicate()
-            raise RuntimeError("Job canceled.")
-
-        chunk = read_chunk(process.stdout, chunk_bytes)
-        if not chunk:
-            break
-
-        payload = overlap_tail + chunk if overlap_tail else chunk
-        overlap_used = overlap_seconds if overlap_tail else 0
-        offset = max(chunk_index * chunk_seconds - overlap_used, 0)
-
-        if progress_callback:
-            percent = int((chunk_index + 1) * 100 / total_chunks) if total_chunks > 0 else 0
-            progress_callback(
-                {
-                    "stage": "transcribe",
-                    "chunk_index": chunk_index + 1,
-                    "total_chunks": total_chunks,
-                    "progress_percent": min(100, percent),
-                    "processed_seconds": (chunk_index + 1) * chunk_seconds,
-                }
-            )
-
-        regions = _compute_regions_from_vad(
-            vad_model=vad_model,
-            pcm_bytes=payload,
-            sample_rate=sample_rate,
-            threshold=vad_threshold,
-            frame_ms=vad_frame_ms,
-            padding_ms=vad_padding_ms,
-            min_speech_ms=vad_min_speech_ms,
-            min_gap_ms=vad_min_gap_ms,
-        )
-        if vad_model is None:
-            regions = [{"start": 0.0, "end": len(payload) / float(sample_rate * bytes_per_sample), "max_score": 1.0}]
-
-        if regions:
-            max_score = max(float(r.get("max_score", 0.0)) for r in regions)
-        else:
-            max_score = 0.0
-        print(
-            f"[subgen][vad] chunk={chunk_index + 1} threshold={vad_threshold:.2f} regions={len(regions)} max={max_score:.3f}",
-            flush=True,
-        )
-
-        for region_index, region in enumerate(regions, start=1):
-            region_start = float(region["start"])
-            region_end = float(region["end"])
-            if region_end <= region_start:
-                continue
-
-            start_sample = int(round(region_start * sample_rate))
-            end_sample = int(round(region_end * sample_rate))
-            start_byte = start_sample * bytes_per_sample
-            end_byte = end_sample * bytes_per_sample
-            start_byte = max(0, min(start_byte, len(payload)))
-            end_byte = max(start_byte, min(end_byte, len(payload)))
-            if start_byte % bytes_per_sample != 0:
-                start_byte -= start_byte % bytes_per_sample
-            if end_byte % bytes_per_sample != 0:
-                end_byte -= end_byte % bytes_per_sample
-            if end_byte - start_byte < sample_rate * bytes_per_sample * 0.1:
-                continue
-
-            region_payload = payload[start_byte:end_byte]
-            print(
-                f"[subgen][vad] chunk={chunk_index + 1} region={region_index} start={region_start:.3f}s end={region_end:.3f}s bytes={len(region_payload)} score={float(region.get('max_score', 0.0)):.3f}",
-                flush=True,
-            )
-
-            used_full_chunk_fallback = False
-            try:
-                result = transcribe_pcm(
-                    endpoint,
-                    region_payload,
-                    sample_rate,
-                    language=language,
-                    api_key=api_key,
-                    timeout=timeout,
-                )
-                result_offset = region_start
-            except RuntimeError as exc:
-                if not _is_retryable_stt_error(exc):
-                    raise
-                print(
-                    f"[subgen][stt] chunk={chunk_index + 1} region={region_index} retryable error; retrying with full chunk",
-                    flush=True,
-                )
-                result = transcribe_pcm(
-                    endpoint,
-                    payload,
-                    sample_rate,
-                    language=language,
-                    api_key=api_key,
-                    timeout=timeout,
-                )
-                result_offset = 0.0
-                used_full_chunk_fallback = True
-
+    def collect(future: Future, offset: float, overlap_used: float) -> None:
+        nonlocal last_norm, last_norm_hash, last_end
+        for result, result_offset in future.result():
             for seg in result.get("segments", []):
                 start = float(seg.get("start", 0.0)) + result_offset
                 end = float(seg.get("end", 0.0)) + result_offset
@@ -217,17 +135,120 @@ def transcribe_media(
                     continue
                 prepared = {"start": start + offset, "end": end + offset, "text": text}
                 norm = normalize_text(prepared["text"])
-                if norm and norm == last_norm and prepared["start"] <= last_end + 0.1:
+                norm_hash = hash(norm)
+                # Integer compare first; the string compare only runs on a hash match.
+                if norm_hash == last_norm_hash and norm and norm == last_norm and prepared["start"] <= last_end + 0.1:
                     continue
                 segments.append(prepared)
                 last_norm = norm
+                last_norm_hash = norm_hash
                 last_end = float(prepared["end"])
 
-            if used_full_chunk_fallback:
+    # STT requests for chunk N run in the background while chunk N+1 is decoded and VAD-scored;
+    # results are merged strictly in chunk order so overlap dedupe is unchanged.
+    executor = ThreadPoolExecutor(max_workers=STT_PIPELINE_DEPTH)
+    pending: Deque[Tuple[Future, float, float]] = deque()
+    # Regions from every in-flight chunk share one request pool, so the server sees at most stt_max_parallel POSTs.
+    stt_max_parallel = max(1, stt_max_parallel)
+    region_executor = ThreadPoolExecutor(max_workers=stt_max_parallel)
+    session = create_session(stt_max_parallel)
+    # ffmpeg decode runs ahead on its own thread so the pipe keeps draining during VAD.
+    chunk_queue: "queue.Queue[Optional[Tuple[int, bytes, bool]]]" = queue.Queue(maxsize=PCM_QUEUE_SIZE)
+    producer = threading.Thread(
+        target=produce_pcm_chunks,
+        args=(process.stdout, chunk_bytes, overlap_bytes, chunk_queue),
+        daemon=True,
+    )
+    producer.start()
+    exhausted = False
+
+    try:
+        while True:
+            if should_cancel and should_cancel():
+                raise RuntimeError("Job canceled.")
+
+            item = chunk_queue.get()
+            if item is None:
+                exhausted = True
                 break
 
-        overlap_tail = chunk[-overlap_bytes:] if overlap_bytes and len(chunk) >= overlap_bytes else chunk
-        chunk_index += 1
+            chunk_index, payload, has_overlap = item
+            overlap_used = overlap_seconds if has_overlap else 0
+            offset = max(chunk_index * chunk_seconds - overlap_used, 0)
+
+            if progress_callback:
+                percent = int((chunk_index + 1) * 100 / total_chunks) if total_chunks > 0 else 0
+                progress_callback(
+                    {
+                        "stage": "transcribe",
+                        "chunk_index": chunk_index + 1,
+                        "total_chunks": total_chunks,
+                        "progress_percent": min(100, percent),
+                        "processed_seconds": (chunk_index + 1) * chunk_seconds,
+                    }
+                )
+
+            if pcm_rms(payload) < SILENCE_RMS:
+                # Silent chunk (credits, ambient): skip both VAD inference and STT.
+                regions = []
+            elif vad_model is None:
+                regions = [{"start": 0.0, "end": len(payload) / float(sample_rate * bytes_per_sample), "max_score": 1.0}]
+            else:
+                regions = _compute_regions_from_vad(
+                    vad_model=vad_model,
+                    pcm_bytes=payload,
+                    sample_rate=sample_rate,
+                    threshold=vad_threshold,
+                    frame_ms=vad_frame_ms,
+                    padding_ms=vad_padding_ms,
+                    min_speech_ms=vad_min_speech_ms,
+                    min_gap_ms=vad_min_gap_ms,
+                )
+
+            if regions:
+                max_score = max(float(r.get("max_score", 0.0)) for r in regions)
+            else:
+                max_score = 0.0
+            print(
+                f"[subgen][vad] chunk={chunk_index + 1} threshold={vad_threshold:.2f} regions={len(regions)} max={max_score:.3f}",
+                flush=True,
+            )
+
+            if regions:
+                future = executor.submit(
+                    _transcribe_regions,
+                    endpoint,
+                    payload,
+                    regions,
+                    chunk_index + 1,
+                    sample_rate,
+                    language,
+                    api_key,
+                    timeout,
+                    region_executor,
+                    session,
+                )
+                pending.append((future, offset, overlap_used))
+                while len(pending) >= STT_PIPELINE_DEPTH:
+                    collect(*pending.popleft())
+
+        while pending:
+            collect(*pending.popleft())
+    except BaseException:
+        executor.shutdown(wait=False, cancel_futures=True)
+        region_executor.shutdown(wait=False, cancel_futures=True)
+        process.kill()
+        # The producer may be blocked on a full queue; once the killed pipe hits EOF it posts None and exits.
+        while not exhausted:
+            exhausted = chunk_queue.get() is None
+        producer.join()
+        process.communicate()
+        raise
+    finally:
+        session.close()
+    executor.shutdown(wait=True)
+    region_executor.shutdown(wait=True)
+    producer.join()
 
     process.communicate()
     if process.returncode not in (0, None):
@@ -235,7 +256,98 @@ def transcribe_media(
     return segments
 
 
+def _transcribe_regions(
+    endpoint: str,
+    payload: bytes,
+    regions: List[Dict[str, float]],
+    chunk_number: int,
+    sample_rate: int,
+    language: str,
+    api_key: Optional[str],
+    timeout: int,
+    executor: ThreadPoolExecutor,
+    session: Optional[requests.Session] = None,
+) -> List[Tuple[Dict[str, Any], float]]:
+    bytes_per_sample = 2
+    submitted: List[Tuple[int, float, Future]] = []
+    for region_index, region in enumerate(regions, start=1):
+        region_start = float(region["start"])
+        region_end = float(region["end"])
+        if region_end <= region_start:
+            continue
+
+        start_sample = int(round(region_start * sample_rate))
+        end_sample = int(round(region_end * sample_rate))
+        start_byte = start_sample * bytes_per_sample
+        end_byte = end_sample * bytes_per_sample
+        start_byte = max(0, min(start_byte, len(payload)))
+        end_byte = max(start_byte, min(end_byte, len(payload)))
+        if start_byte % bytes_per_sample != 0:
+            start_byte -= start_byte % bytes_per_sample
+        if end_byte % bytes_per_sample != 0:
+            end_byte -= end_byte % bytes_per_sample
+        if end_byte - start_byte < sample_rate * bytes_per_sample * 0.1:
+            continue
+
+        region_payload = payload[start_byte:end_byte]
+        print(
+            f"[subgen][vad] chunk={chunk_number} region={region_index} start={region_start:.3f}s end={region_end:.3f}s bytes={len(region_payload)} score={float(region.get('max_score', 0.0)):.3f}",
+            flush=True,
+        )
+        future = executor.submit(
+            transcribe_pcm,
+            endpoint,
+            region_payload,
+            sample_rate,
+            language=language,
+            api_key=api_key,
+            timeout=timeout,
+            session=session,
+        )
+        submitted.append((region_index, region_start, future))
+
+    # All regions are in flight at once; results are still consumed in region order.
+    results: List[Tuple[Dict[str, Any], float]] = []
+    try:
+        for region_index, region_start, future in submitted:
+            try:
+                result = future.result()
+            except RuntimeError as exc:
+                if not _is_retryable_stt_error(exc):
+                    raise
+                print(
+                    f"[subgen][stt] chunk={chunk_number} region={region_index} retryable error; retrying with full chunk",
+                    flush=True,
+                )
+                for _, _, queued in submitted:
+                    queued.cancel()
+                result = executor.submit(
+                    transcribe_pcm,
+                    endpoint,
+                    payload,
+                    sample_rate,
+                    language=language,
+                    api_key=api_key,
+                    timeout=timeout,
+                    session=session,
+                ).result()
+                results.append((result, 0.0))
+                break
+            results.append((result, region_start))
+    finally:
+        for _, _, future in submitted:
+            future.cancel()
+    return results
+
+
 def _estimate_total_chunks(media_path: Path, chunk_seconds: int) -> int:
+    duration = _probe_duration(media_path)
+    if duration <= 0:
+        return 0
+    return max(1, int(math.ceil(duration / max(chunk_seconds, 1))))
+
+
+def _probe_duration(media_path: Path) -> float:
     cmd = [
         "ffprobe",
         "-v",
@@ -249,12 +361,9 @@ def _estimate_total_chunks(media_path: Path, chunk_seconds: int) -> int:
     try:
         output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
         payload = json.loads(output.decode("utf-8", errors="ignore"))
-        duration = float(payload.get("format", {}).get("duration", 0.0))
+        return float(payload.get("format", {}).get("duration", 0.0))
     except (subprocess.CalledProcessError, json.JSONDecodeError, ValueError, TypeError):
-        return 0
-    if duration <= 0:
-        return 0
-    return max(1, int(math.ceil(duration / max(chunk_seconds, 1))))
+        return 0.0
 
 
 def _compute_regions_from_vad(
@@ -281,78 +390,51 @@ def _compute_regions_from_vad(
     if usable <= 0:
         return []
 
-    pcm = np.frombuffer(pcm_bytes[:usable], dtype=np.int16)
     total_frames = usable // frame_bytes
-    scores: List[float] = []
-    for i in range(total_frames):
-        start = i * frame_samples
-        end = start + frame_samples
-        frame = pcm[start:end]
-        score = float(vad_model.predict(frame, frame_size=frame_samples))
-        scores.append(score)
-
-    active: List[Dict[str, float]] = []
-    current_start: Optional[int] = None
-    current_max = 0.0
-    for i, score in enumerate(scores):
-        if score >= threshold:
-            if current_start is None:
-                current_start = i
-                current_max = score
-            else:
-                current_max = max(current_max, score)
-        elif current_start is not None:
-            active.append({"start_frame": float(current_start), "end_frame": float(i), "max_score": float(current_max)})
-            current_start = None
-            current_max = 0.0
-    if current_start is not None:
-        active.append(
-            {"start_frame": float(current_start), "end_frame": float(total_frames), "max_score": float(current_max)}
-        )
+    frames = np.frombuffer(pcm_bytes, dtype=np.int16, count=usable // 2).reshape(total_frames, frame_samples)
+    # Silero carries its LSTM state from frame to frame, so frames are scored in order rather than as one batch.
+    scores = np.fromiter(
+        (vad_model.predict(frame, frame_size=frame_samples) for frame in frames),
+        dtype=np.float64,
+        count=total_frames,
+    )
 
-    if not active:
+    # Rising/falling edges of the above-threshold mask give each run as [start, end) frame indices.
+    edges = np.diff(np.concatenate(([0], (scores >= threshold).astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if starts.size == 0:
         return []
+    run_max = np.maximum.reduceat(np.append(scores, 0.0), np.column_stack((starts, ends)).ravel())[::2]
 
     min_gap_frames = max(1, int(min_gap_ms / frame_ms))
-    merged: List[Dict[str, float]] = []
-    for r in active:
-        if not merged:
-            merged.append(dict(r))
-            continue
-        prev = merged[-1]
-        gap = int(r["start_frame"] - prev["end_frame"])
-        if gap <= min_gap_frames:
-            prev["end_frame"] = r["end_frame"]
-            prev["max_score"] = max(float(prev["max_score"]), float(r["max_score"]))
-        else:
-            merged.append(dict(r))
+    groups = np.flatnonzero(np.concatenate(([True], starts[1:] - ends[:-1] > min_gap_frames)))
+    group_max = np.maximum.reduceat(run_max, groups)
+    group_starts = starts[groups]
+    group_ends = ends[np.append(groups[1:] - 1, ends.size - 1)]
 
     pad_frames = max(0, int(padding_ms / frame_ms))
     min_speech_frames = max(1, int(min_speech_ms / frame_ms))
-    regions: List[Dict[str, float]] = []
-    for r in merged:
-        start_frame = max(0, int(r["start_frame"]) - pad_frames)
-        end_frame = min(total_frames, int(r["end_frame"]) + pad_frames)
-        if end_frame - start_frame < min_speech_frames:
-            continue
-        start_s = (start_frame * frame_samples) / float(sample_rate)
-        end_s = (end_frame * frame_samples) / float(sample_rate)
-        regions.append({"start": start_s, "end": end_s, "max_score": float(r["max_score"])})
-
-    if not regions:
+    start_frames = np.maximum(group_starts - pad_frames, 0)
+    end_frames = np.minimum(group_ends + pad_frames, total_frames)
+    keep = end_frames - start_frames >= min_speech_frames
+    start_frames, end_frames, group_max = start_frames[keep], end_frames[keep], group_max[keep]
+    if start_frames.size == 0:
         return []
 
     # Merge any overlaps introduced by padding so we avoid retranscribing the same audio.
-    regions.sort(key=lambda r: (float(r["start"]), float(r["end"])))
-    compact: List[Dict[str, float]] = [dict(regions[0])]
-    for region in regions[1:]:
-        prev = compact[-1]
-        if float(region["start"]) <= float(prev["end"]):
-            prev["end"] = max(float(prev["end"]), float(region["end"]))
-            prev["max_score"] = max(float(prev["max_score"]), float(region["max_score"]))
-        else:
-            compact.append(dict(region))
-    return compact
+    merged = np.flatnonzero(np.concatenate(([True], start_frames[1:] > end_frames[:-1])))
+    region_max = np.maximum.reduceat(group_max, merged)
+    region_starts = start_frames[merged]
+    region_ends = end_frames[np.append(merged[1:] - 1, end_frames.size - 1)]
+    return [
+        {
+            "start": (start_frame * frame_samples) / float(sample_rate),
+            "end": (end_frame * frame_samples) / float(sample_rate),
+            "max_score": max_score,
+        }
+        for start_frame, end_frame, max_score in zip(region_starts.tolist(), region_ends.tolist(), region_max.tolist())
+    ]
 
 
 def _is_retryable_stt_error(exc: RuntimeError) -> bool:
@@ -1,15 +1,44 @@
 from __future__ import annotations
 
 import json
-import re
+import os
+import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Callable, Dict, Iterable, List, Optional
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-import requests
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+from .net import shared_session
 
 
 GOOGLE_TRANSLATE_ENDPOINT = "https://translation.googleapis.com/language/translate/v2"
 ANTHROPIC_MESSAGES_ENDPOINT = "https://api.anthropic.com/v1/messages"
+ANTHROPIC_MAX_TOKENS_CAP = 8192
+# translate/v2 accepts at most 128 q entries per request; the character budget keeps bodies well under its size limit.
+GOOGLE_MAX_BATCH_ITEMS = 128
+GOOGLE_MAX_BATCH_CHARS = 5000
+# Concurrent translate/v2 requests per job; raise it when the project's per-second quota allows.
+GOOGLE_MAX_PARALLEL = max(1, int(os.environ.get("SUBGEN_TRANSLATE_MAX_PARALLEL") or 4))
+_JSON_DECODER = json.JSONDecoder()
+# Google results keyed by (source, target, text), kept across jobs so re-translating a file is mostly free.
+TRANSLATION_CACHE_SIZE = 20000
+_TRANSLATION_CACHE: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+_TRANSLATION_CACHE_LOCK = threading.Lock()
+# Forcing this tool makes the reply a schema-checked object instead of JSON embedded in prose.
+_ANTHROPIC_TRANSLATE_TOOL = {
+    "name": "translate_lines",
+    "description": "Return the translated subtitle lines, one per input line, in input order.",
+    "input_schema": {
+        "type": "object",
+        "properties": {"translations": {"type": "array", "items": {"type": "string"}}},
+        "required": ["translations"],
+    },
+}
 
 
 def translate_segments(
@@ -17,56 +46,73 @@ def translate_segments(
     target_language: str,
     api_key: str,
     source_language: Optional[str] = None,
-    batch_size: int = 30,
+    batch_size: int = GOOGLE_MAX_BATCH_ITEMS,
     timeout: int = 120,
     progress_callback: Optional[Callable[[Dict[str, object]], None]] = None,
     should_cancel: Optional[Callable[[], bool]] = None,
+    max_parallel: int = GOOGLE_MAX_PARALLEL,
 ) -> List[Dict[str, object]]:
     if not api_key:
         raise ValueError("Google Translate API key is required for translation.")
 
-    segment_list = list(segments)
-    translated: List[Dict[str, object]] = []
-    for start in range(0, len(segment_list), batch_size):
-        if should_cancel and should_cancel():
-            raise RuntimeError("Job canceled.")
-        batch = segment_list[start : start + batch_size]
-        if progress_callback:
-            progress_callback(
-                {
-                    "stage": "translate",
-                    "processed_segments": min(start, len(segment_list)),
-                    "total_segments": len(segment_list),
-                }
-            )
-        texts = [str(item.get("text", "")).strip() for item in batch]
-        translated_texts = _translate_batch(
-            texts,
-            target_language,
-            api_key,
-            source_language=source_language,
-            timeout=timeout,
+    # Lists (every caller today) are used as-is; only other iterables are materialized.
+    segment_list = segments if isinstance(segments, list) else list(segments)
+    texts = [str(item.get("text", "")).strip() for item in segment_list]
+    unique_texts = _unique_texts(texts)
+    cache_key = (source_language or "", target_language)
+    lookup = _cached_translations(cache_key, unique_texts)
+    missing_texts = [text for text in unique_texts if text not in lookup]
+    batches = _pack_batches(missing_texts, min(batch_size, GOOGLE_MAX_BATCH_ITEMS), GOOGLE_MAX_BATCH_CHARS)
+
+    translated_by_index: Dict[int, List[str]] = {}
+    processed_segments = len(lookup)
+    if progress_callback:
+        progress_callback(
+            {
+                "stage": "translate",
+                "processed_segments": 0,
+                "total_segments": len(segment_list),
+            }
         )
-        if len(translated_texts) != len(batch):
-            translated_texts = []
-            for line in texts:
-                translated_texts.append(
-                    _translate_single(
-                        line,
-                        target_language,
-                        api_key,
-                        source_language=source_language,
-                        timeout=timeout,
-                    )
-                )
-        for original, new_text in zip(batch, translated_texts):
-            translated.append(
-                {
-                    "start": float(original.get("start", 0.0)),
-                    "end": float(original.get("end", 0.0)),
-                    "text": new_text,
-                }
+    # Each batch is one independent round trip, so several are kept in flight at once.
+    with ThreadPoolExecutor(max_workers=max(1, int(max_parallel))) as executor:
+        future_map = {}
+        for batch_index, batch in enumerate(batches):
+            if should_cancel and should_cancel():
+                raise RuntimeError("Job canceled.")
+            future = executor.submit(
+                _translate_google_batch,
+                batch,
+                target_language,
+                api_key,
+                source_language,
+                timeout,
             )
+            future_map[future] = batch_index
+
+        for future in as_completed(future_map):
+            if should_cancel and should_cancel():
+                for pending in future_map:
+                    pending.cancel()
+                raise RuntimeError("Job canceled.")
+            batch_index = future_map[future]
+            translated_by_index[batch_index] = future.result()
+            processed_segments += len(batches[batch_index])
+            if progress_callback:
+                progress_callback(
+                    {
+                        "stage": "translate",
+                        "processed_segments": processed_segments * len(segment_list) // len(unique_texts),
+                        "total_segments": len(segment_list),
+                    }
+                )
+
+    fresh: Dict[str, str] = {}
+    for batch_index, batch in enumerate(batches):
+        fresh.update(zip(batch, translated_by_index[batch_index]))
+    _remember_translations(cache_key, fresh)
+    lookup.update(fresh)
+    translated = _apply_translations(segment_list, texts, lookup)
     if progress_callback:
         progress_callback(
             {
@@ -78,6 +124,95 @@ def translate_segments(
     return translated
 
 
+def _pack_batches(texts: List[str], max_items: int, max_chars: int, per_item: int = 0) -> List[List[str]]:
+    # Greedy fill: short lines share one request instead of paying a round trip per fixed-size slice.
+    batches: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for text in texts:
+        cost = len(text) + per_item
+        if current and (len(current) >= max_items or used + cost > max_chars):
+            batches.append(current)
+            current = []
+            used = 0
+        current.append(text)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _unique_texts(texts: List[str]) -> List[str]:
+    # Repeated lines ("[Music]", refrains) are translated once; empty lines never reach the provider.
+    return list(dict.fromkeys(text for text in texts if text))
+
+
+def _cached_translations(cache_key: Tuple[str, str], texts: List[str]) -> Dict[str, str]:
+    found: Dict[str, str] = {}
+    with _TRANSLATION_CACHE_LOCK:
+        for text in texts:
+            hit = _TRANSLATION_CACHE.get((*cache_key, text))
+            if hit is not None:
+                _TRANSLATION_CACHE.move_to_end((*cache_key, text))
+                found[text] = hit
+    return found
+
+
+def _remember_translations(cache_key: Tuple[str, str], translations: Dict[str, str]) -> None:
+    with _TRANSLATION_CACHE_LOCK:
+        for text, translated in translations.items():
+            # An empty result is a failed or dropped translation; leave it uncached so the next call retries it.
+            if not translated:
+                continue
+            _TRANSLATION_CACHE[(*cache_key, text)] = translated
+            _TRANSLATION_CACHE.move_to_end((*cache_key, text))
+        while len(_TRANSLATION_CACHE) > TRANSLATION_CACHE_SIZE:
+            _TRANSLATION_CACHE.popitem(last=False)
+
+
+def _apply_translations(
+    segment_list: List[Dict[str, object]],
+    texts: List[str],
+    lookup: Dict[str, str],
+) -> List[Dict[str, object]]:
+    return [
+        {
+            "start": float(original.get("start", 0.0)),
+            "end": float(original.get("end", 0.0)),
+            "text": lookup.get(text, text),
+        }
+        for original, text in zip(segment_list, texts)
+    ]
+
+
+def _translate_google_batch(
+    texts: List[str],
+    target_language: str,
+    api_key: str,
+    source_language: Optional[str],
+    timeout: int,
+) -> List[str]:
+    translated_texts = _translate_batch(
+        texts,
+        target_language,
+        api_key,
+        source_language=source_language,
+        timeout=timeout,
+    )
+    if len(translated_texts) == len(texts):
+        return translated_texts
+    return [
+        _translate_single(
+            line,
+            target_language,
+            api_key,
+            source_language=source_language,
+            timeout=timeout,
+        )
+        for line in texts
+    ]
+
+
 def _translate_batch(
     texts: List[str],
     target_language: str,
@@ -89,16 +224,16 @@ def _translate_batch(
     if source_language:
         payload["source"] = source_language
     headers = {"content-type": "application/json"}
-    response = requests.post(
+    response = shared_session(GOOGLE_TRANSLATE_ENDPOINT).post(
         GOOGLE_TRANSLATE_ENDPOINT,
         headers=headers,
         params={"key": api_key},
-        json=payload,
+        data=_dump_json(payload),
         timeout=timeout,
     )
     if response.status_code >= 400:
         raise RuntimeError(f"Google Translate error {response.status_code}: {response.text}")
-    data = response.json()
+    data = orjson.loads(response.content) if orjson is not None else response.json()
     if not isinstance(data, dict):
         raise RuntimeError("Google Translate response was not a JSON object.")
     translations = data.get("data", {}).get("translations", [])
@@ -107,6 +242,12 @@ def _translate_batch(
     return [str(item.get("translatedText", "")).strip() for item in translations]
 
 
+def _dump_json(payload: Dict[str, object]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
 def _translate_single(
     text: str,
     target_language: str,
@@ -143,12 +284,14 @@ def translate_segments_anthropic(
     if not model:
         raise ValueError("Anthropic model is required for Anthropic translation.")
 
-    segment_list = list(segments)
-    batches: List[Dict[str, object]] = []
-    for batch_index, start in enumerate(range(0, len(segment_list), batch_size)):
-        batch = segment_list[start : start + batch_size]
-        texts = [str(item.get("text", "")).strip() for item in batch]
-        batches.append({"index": batch_index, "items": batch, "texts": texts})
+    segment_list = segments if isinstance(segments, list) else list(segments)
+    texts = [str(item.get("text", "")).strip() for item in segment_list]
+    unique_texts = _unique_texts(texts)
+    # Batches are also cut by size so the reply always fits under ANTHROPIC_MAX_TOKENS_CAP.
+    packed = _pack_batches(unique_texts, batch_size, ANTHROPIC_MAX_TOKENS_CAP - 256, per_item=16)
+    batches: List[Dict[str, object]] = [
+        {"index": batch_index, "texts": batch_texts} for batch_index, batch_texts in enumerate(packed)
+    ]
 
     translated_by_index: Dict[int, List[str]] = {}
     processed_segments = 0
@@ -177,7 +320,7 @@ def translate_segments_anthropic(
 
             batch = future_map[future]
             translated_texts = future.result()
-            expected_count = len(batch["items"])
+            expected_count = len(batch["texts"])
             actual_count = len(translated_texts)
             if actual_count != expected_count:
                 print(
@@ -195,24 +338,18 @@ def translate_segments_anthropic(
                 progress_callback(
                     {
                         "stage": "translate",
-                        "processed_segments": min(processed_segments, len(segment_list)),
+                        "processed_segments": processed_segments * len(segment_list) // len(unique_texts),
                         "total_segments": len(segment_list),
                     }
                 )
 
-    translated: List[Dict[str, object]] = []
-    for batch in sorted(batches, key=lambda item: int(item["index"])):
+    lookup: Dict[str, str] = {}
+    for batch in batches:
         translated_texts = translated_by_index.get(int(batch["index"]), [])
-        if len(translated_texts) != len(batch["items"]):
+        if len(translated_texts) != len(batch["texts"]):
             translated_texts = batch["texts"]
-        for original, new_text in zip(batch["items"], translated_texts):
-            translated.append(
-                {
-                    "start": float(original.get("start", 0.0)),
-                    "end": float(original.get("end", 0.0)),
-                    "text": new_text,
-                }
-            )
+        lookup.update(zip(batch["texts"], translated_texts))
+    translated = _apply_translations(segment_list, texts, lookup)
     if progress_callback:
         progress_callback(
             {
@@ -232,31 +369,26 @@ def _anthropic_translate_batch(
     source_language: Optional[str],
     timeout: int,
 ) -> List[str]:
-    try:
-        from anthropic import Anthropic
-    except Exception as exc:
-        raise RuntimeError(f"Anthropic SDK is required for Anthropic translation: {exc}") from exc
-
+    client = _anthropic_client(api_key, timeout)
     system = (
         "You are a subtitle translation engine. Translate each input subtitle line to the target language. "
-        "Keep line order and count identical. Do not merge or split entries. Return only valid JSON."
+        "Keep line order and count identical. Do not merge or split entries."
     )
     source_hint = source_language or "auto-detect"
     user_prompt = (
         f"Source language: {source_hint}\n"
         f"Target language: {target_language}\n"
-        "Return exactly this schema as JSON:\n"
-        '{"translations":["..."]}\n'
         "Input lines JSON:\n"
         + json.dumps(texts, ensure_ascii=False)
     )
-    client = Anthropic(api_key=api_key, timeout=timeout)
     response = client.messages.create(
         model=model,
-        max_tokens=max(1024, len(texts) * 48),
+        max_tokens=_anthropic_max_tokens(texts),
         temperature=0,
         system=system,
         messages=[{"role": "user", "content": user_prompt}],
+        tools=[_ANTHROPIC_TRANSLATE_TOOL],
+        tool_choice={"type": "tool", "name": _ANTHROPIC_TRANSLATE_TOOL["name"]},
     )
     content = getattr(response, "content", None)
     if not isinstance(content, list):
@@ -264,35 +396,87 @@ def _anthropic_translate_batch(
     text_blocks: List[str] = []
     for block in content:
         block_type = getattr(block, "type", "")
-        block_text = getattr(block, "text", "")
+        if block_type == "tool_use":
+            tool_input = getattr(block, "input", None)
+            translations = tool_input.get("translations") if isinstance(tool_input, dict) else None
+            if not isinstance(translations, list):
+                raise RuntimeError("Anthropic tool call missing translations array.")
+            return [str(item).strip() for item in translations]
         if block_type == "text":
-            text_blocks.append(str(block_text))
-    joined = "\n".join(text_blocks).strip()
-    if not joined:
+            text_blocks.append(str(getattr(block, "text", "")))
+    # Fall back to JSON in a text block in case a model ignores tool_choice; blocks are tried one by one
+    # before paying for a join over the whole reply.
+    if not any(block_text.strip() for block_text in text_blocks):
         raise RuntimeError("Anthropic response did not include translation text.")
-    payload_json = _extract_json_object(joined)
+    for block_text in text_blocks:
+        try:
+            payload_json = _extract_json_object(block_text)
+            break
+        except RuntimeError:
+            continue
+    else:
+        payload_json = _extract_json_object("\n".join(text_blocks))
     translations = payload_json.get("translations", [])
     if not isinstance(translations, list):
         raise RuntimeError("Anthropic response missing translations array.")
     return [str(item).strip() for item in translations]
 
 
+@lru_cache(maxsize=4)
+def _anthropic_client(api_key: str, timeout: int) -> object:
+    # One client (and its httpx connection pool) per key; the SDK client is safe to share across threads.
+    try:
+        from anthropic import Anthropic
+    except Exception as exc:
+        raise RuntimeError(f"Anthropic SDK is required for Anthropic translation: {exc}") from exc
+    return Anthropic(api_key=api_key, timeout=timeout, http_client=_anthropic_http_client())
+
+
+def _anthropic_http_client() -> Optional[object]:
+    # HTTP/2 lets concurrent batches share one connection as multiplexed streams; needs the h2 package.
+    try:
+        import h2  # noqa: F401
+        from anthropic import DefaultHttpxClient
+    except ImportError:
+        return None
+    return DefaultHttpxClient(http2=True)
+
+
+def _anthropic_max_tokens(texts: List[str]) -> int:
+    # About one token per input character covers dense scripts; each line adds quoting/tool-call framing.
+    chars = sum(len(text) for text in texts)
+    return min(ANTHROPIC_MAX_TOKENS_CAP, max(1024, chars + 16 * len(texts) + 256))
+
+
 def _extract_json_object(text: str) -> Dict[str, object]:
     cleaned = text.strip()
-    fence = re.search(r"```(?:json)?\s*(\{.*\})\s*```", cleaned, flags=re.DOTALL)
-    if fence:
-        cleaned = fence.group(1)
+    # Take the body of a ``` / ```json fence with plain finds; the brace scan below handles any leftovers.
+    fence_start = cleaned.find("```")
+    fence_end = cleaned.rfind("```")
+    if fence_start != -1 and fence_end > fence_start:
+        inner = cleaned[fence_start + 3 : fence_end].strip()
+        if inner.startswith("json"):
+            inner = inner[4:].lstrip()
+        if inner.startswith("{"):
+            cleaned = inner
     try:
-        payload = json.loads(cleaned)
+        payload = _load_json(cleaned)
     except json.JSONDecodeError as exc:
         start = cleaned.find("{")
-        end = cleaned.rfind("}")
-        if start == -1 or end == -1 or end <= start:
+        if start == -1:
             raise RuntimeError(f"Anthropic response did not contain valid JSON: {exc}") from exc
         try:
-            payload = json.loads(cleaned[start : end + 1])
+            # Decode the first object in place and ignore whatever prose follows it.
+            payload, _ = _JSON_DECODER.raw_decode(cleaned, start)
         except json.JSONDecodeError as exc2:
             raise RuntimeError(f"Anthropic response did not contain valid JSON: {exc2}") from exc2
     if not isinstance(payload, dict):
         raise RuntimeError("Anthropic JSON payload is not an object.")
     return payload
+
+
+def _load_json(text: str) -> object:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch one type either way.
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
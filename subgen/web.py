@@ -1,49 +1,121 @@
 from __future__ import annotations
 
 import argparse
+import atexit
+import hashlib
 import json
 import os
-import tempfile
+import secrets
+import sys
 import threading
 import time
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
 from flask import Flask, jsonify, request, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.routing import BaseConverter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    from whitenoise import WhiteNoise
+except ImportError:  # pragma: no cover - optional speedup
+    WhiteNoise = None
 
 from .library import (
     INDEX_FILENAME,
-    describe_media,
-    extract_embedded_sub,
+    describe_media_cached,
     load_media_index,
+    read_embedded_sub,
     save_media_index,
     scan_media_with_index,
 )
-from .subtitles import format_srt, parse_srt
+from .subtitles import parse_srt, read_subtitle_text, write_srt
 from .transcribe import transcribe_media
 from .translate import translate_segments, translate_segments_anthropic
 
 CONFIG_PATH = os.environ.get("SUBGEN_CONFIG_PATH", "/app/config.json")
 FALLBACK_CONFIG_PATH = os.path.join(os.getcwd(), "config.json")
+# Generate jobs run on a bounded pool; scans get their own single thread so they never queue behind them.
+JOB_WORKERS = int(os.environ.get("SUBGEN_JOB_WORKERS") or max(4, min(8, (os.cpu_count() or 1) * 2)))
+# Queued plus running generate jobs; beyond this /api/subtitles/generate answers 503.
+JOB_QUEUE_LIMIT = 64
+# Job progress is published at most this often (seconds) while a stage is running.
+PROGRESS_MIN_INTERVAL = 0.2
+_PROGRESS_KEYS = (
+    ("processed_segments", "total_segments"),
+    ("chunk_index", "total_chunks"),
+    ("scanned_files", "total_files"),
+)
 
 
 def load_config() -> Dict[str, object]:
     for path in (CONFIG_PATH, FALLBACK_CONFIG_PATH):
+        if not os.path.isfile(path):
+            print(f"[subgen] config not found at {path}")
+            continue
         try:
-            with open(path, "r", encoding="utf-8") as handle:
-                payload = json.load(handle)
-            print(f"[subgen] loaded config from {path}")
-            return payload
-        except FileNotFoundError:
+            payload = _parse_config(path, os.stat(path).st_mtime_ns)
+        except OSError:
             print(f"[subgen] config not found at {path}")
             continue
         except json.JSONDecodeError as exc:
             print(f"[subgen] config parse error at {path}: {exc}")
             return {}
+        print(f"[subgen] loaded config from {path}")
+        return dict(payload)
     return {}
 
 
+@lru_cache(maxsize=4)
+def _parse_config(path: str, mtime_ns: int) -> Dict[str, object]:
+    # mtime in the key picks up edits; repeated main() calls (tests, reloads) skip the parse.
+    with open(path, "rb") as handle:
+        data = handle.read()
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch one type either way.
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class _JobIdConverter(BaseConverter):
+    # Matches the ids minted by _create_job_record.
+    regex = "[0-9a-f]{32}"
+
+
+class _OrjsonProvider(DefaultJSONProvider):
+    # /api/media can return thousands of items; orjson encodes them several times faster.
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._option()).decode("utf-8")
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._option())
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    def _option(self) -> int:
+        # Non-str keys are stringified like the stdlib encoder does instead of falling back to it.
+        option = orjson.OPT_NON_STR_KEYS
+        return option | orjson.OPT_SORT_KEYS if self.sort_keys else option
+
+
 def create_app(
     base_dir: str,
     stt_endpoint: str,
@@ -51,13 +123,32 @@ def create_app(
     vad_threshold: float = 0.30,
 ) -> Flask:
     app = Flask(__name__, static_folder="web/static")
+    app.url_map.converters["job_id"] = _JobIdConverter
+    if orjson is not None:
+        app.json = _OrjsonProvider(app)
+    if WhiteNoise is not None:
+        # Static assets are answered from an in-memory file table before the Flask request stack.
+        # The file names are not content-hashed, so the cache lifetime stays short.
+        app.wsgi_app = WhiteNoise(app.wsgi_app, root=app.static_folder, prefix="static/", max_age=60)
     app.config["BASE_DIR"] = base_dir
     app.config["STT_ENDPOINT"] = stt_endpoint
     app.config["VAD_THRESHOLD"] = vad_threshold
     app.config["INDEX_PATH"] = index_path
-    app.config["MEDIA_CACHE"] = load_media_index(base_dir, index_path=index_path)
+    # Resolved once; scans and saves then get an absolute path that needs no further resolve().
+    app.config["INDEX_PATH_RESOLVED"] = str(_startup_index_path(base_dir, index_path))
+    app.config["MEDIA_CACHE"] = load_media_index(base_dir, index_path=app.config["INDEX_PATH_RESOLVED"])
+    # The per-process token keeps ETags from a previous server run from matching after a restart.
+    app.config["MEDIA_CACHE_TOKEN"] = secrets.token_hex(4)
+    app.config["MEDIA_CACHE_VERSION"] = 0
     app.config["JOB_LOCK"] = threading.Lock()
     app.config["JOBS"] = {}
+    app.config["JOB_EXECUTOR"] = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="subgen-job")
+    app.config["SCAN_EXECUTOR"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="subgen-scan")
+    app.config["JOB_SLOTS"] = threading.BoundedSemaphore(JOB_QUEUE_LIMIT)
+    app.config["JOBS_SHUT_DOWN"] = False
+    # Covers servers that only import wsgi_app() (gunicorn, waitress-serve), not just main(). The executors'
+    # workers are joined by threading's exit hook, which runs before atexit callbacks, so register beside it.
+    getattr(threading, "_register_atexit", atexit.register)(_shutdown_jobs, app)
     if app.config["MEDIA_CACHE"]:
         print(f"[subgen] loaded {len(app.config['MEDIA_CACHE'])} media items from subgen.json")
     else:
@@ -65,7 +156,7 @@ def create_app(
     print(
         f"[subgen] config base_dir={base_dir} stt_endpoint={stt_endpoint} vad_threshold={vad_threshold:.2f}"
     )
-    startup_index_path = _startup_index_path(base_dir, index_path)
+    startup_index_path = Path(app.config["INDEX_PATH_RESOLVED"])
     startup_has_index = startup_index_path.exists() and startup_index_path.is_file()
     startup_full_scan = not startup_has_index
     print(
@@ -74,9 +165,16 @@ def create_app(
     )
     _start_scan(app, full_scan=startup_full_scan)
 
+    # The SPA shell never changes while the server runs, so it is read once and revalidated by ETag.
+    index_body = (Path(app.static_folder) / "index.html").read_bytes()
+    index_etag = hashlib.sha1(index_body).hexdigest()
+
     @app.route("/")
     def index():
-        return send_from_directory(app.static_folder, "index.html")
+        response = app.response_class(index_body, mimetype="text/html")
+        response.set_etag(index_etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
 
     @app.route("/static/<path:filename>")
     def static_files(filename: str):
@@ -87,8 +185,18 @@ def create_app(
         rescan = request.args.get("rescan") == "1"
         if rescan:
             _start_scan(app, full_scan=False)
-        items = app.config.get("MEDIA_CACHE", [])
-        return jsonify({"media_dir": app.config["BASE_DIR"], "items": items})
+        # The body is encoded once per index version; polls with a matching ETag get a bodiless 304.
+        version = app.config["MEDIA_CACHE_VERSION"]
+        cached = app.config.get("MEDIA_RESPONSE")
+        if not cached or cached[0] != version:
+            items = app.config.get("MEDIA_CACHE", [])
+            body = jsonify({"media_dir": app.config["BASE_DIR"], "items": items}).get_data()
+            cached = (version, body)
+            app.config["MEDIA_RESPONSE"] = cached
+        response = app.response_class(cached[1], mimetype="application/json")
+        response.set_etag(f"{app.config['MEDIA_CACHE_TOKEN']}-{version}", weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
 
     @app.route("/api/media/describe", methods=["POST"])
     def api_media_describe():
@@ -96,22 +204,26 @@ def create_app(
         media_path = data.get("path")
         if not media_path:
             return jsonify({"error": "Missing media path"}), 400
-        item = describe_media(Path(media_path))
+        item = describe_media_cached(Path(media_path))
         return jsonify(item)
 
     @app.route("/api/subtitles/generate", methods=["POST"])
     def api_generate():
         data = request.get_json(silent=True) or {}
         job_id = _create_job(app, data)
+        if job_id is None:
+            return jsonify({"error": "Too many queued jobs"}), 503
         return jsonify({"job_id": job_id})
 
     @app.route("/api/jobs")
     def api_jobs_list():
-        jobs = list(app.config["JOBS"].values())
+        # dict() copies are taken under the GIL, so each job is a consistent snapshot even mid-update.
+        jobs = [dict(job) for job in list(app.config["JOBS"].values())]
         jobs.sort(key=lambda item: item.get("created_at", 0), reverse=True)
         return jsonify({"jobs": jobs})
 
-    @app.route("/api/jobs/<job_id>", methods=["DELETE"])
+    # Malformed job ids are rejected by the router with a 404.
+    @app.route("/api/jobs/<job_id:job_id>", methods=["DELETE"])
     def api_job_delete(job_id: str):
         with app.config["JOB_LOCK"]:
             job = app.config["JOBS"].get(job_id)
@@ -142,47 +254,39 @@ def _generate_from_existing(
     progress_callback=None,
     should_cancel=None,
 ) -> Dict[str, object]:
-    temp_path = None
-    try:
-        if existing["kind"] == "embedded":
-            temp_handle = tempfile.NamedTemporaryFile(delete=False, suffix=".srt")
-            temp_handle.close()
-            temp_path = Path(temp_handle.name)
-            extract_embedded_sub(media_path, int(existing["stream_index"]), temp_path)
-            source_path = temp_path
-        else:
-            source_path = Path(existing["path"])
-
-        segments = parse_srt(source_path.read_text(encoding="utf-8", errors="ignore"))
-        if not segments:
-            return {"error": "Existing subtitle was empty."}
-        if should_cancel and should_cancel():
-            raise RuntimeError("Job canceled.")
-
-        outputs: List[str] = []
-        if target_lang == source_lang and not require_translate:
-            output = output_path_for(source_lang)
-            output.write_text(format_srt(segments), encoding="utf-8")
-            outputs.append(str(output))
-            return {"outputs": outputs}
-
-        translated = _translate_with_provider(
-            provider=translate_provider,
-            segments=segments,
-            target_lang=target_lang,
-            source_lang=source_lang,
-            anthropic_model=anthropic_model,
-            anthropic_max_parallel=anthropic_max_parallel,
-            progress_callback=progress_callback,
-            should_cancel=should_cancel,
-        )
-        output = output_path_for(target_lang)
-        output.write_text(format_srt(translated), encoding="utf-8")
+    if existing["kind"] == "embedded":
+        # ffmpeg writes the converted stream to its stdout, so no temp file round trip is needed.
+        source_text = read_embedded_sub(media_path, int(existing["stream_index"]))
+    else:
+        source_text = read_subtitle_text(existing["path"])
+
+    segments = parse_srt(source_text)
+    if not segments:
+        return {"error": "Existing subtitle was empty."}
+    if should_cancel and should_cancel():
+        raise RuntimeError("Job canceled.")
+
+    outputs: List[str] = []
+    if target_lang == source_lang and not require_translate:
+        output = output_path_for(source_lang)
+        write_srt(output, segments)
         outputs.append(str(output))
         return {"outputs": outputs}
-    finally:
-        if temp_path and temp_path.exists():
-            temp_path.unlink()
+
+    translated = _translate_with_provider(
+        provider=translate_provider,
+        segments=segments,
+        target_lang=target_lang,
+        source_lang=source_lang,
+        anthropic_model=anthropic_model,
+        anthropic_max_parallel=anthropic_max_parallel,
+        progress_callback=progress_callback,
+        should_cancel=should_cancel,
+    )
+    output = output_path_for(target_lang)
+    write_srt(output, translated)
+    outputs.append(str(output))
+    return {"outputs": outputs}
 
 
 def _resolve_existing_sub(media: Dict[str, object], existing_id: Optional[str]) -> Optional[Dict[str, object]]:
@@ -244,7 +348,10 @@ def _translate_with_provider(
     )
 
 
-def _create_job(app: Flask, payload: Dict[str, object]) -> str:
+def _create_job(app: Flask, payload: Dict[str, object]) -> Optional[str]:
+    slots = app.config["JOB_SLOTS"]
+    if not slots.acquire(blocking=False):
+        return None
     media_path = str(payload.get("media_path") or "")
     mode = str(payload.get("mode") or "transcribe")
     title = Path(media_path).stem if media_path else "Subtitle job"
@@ -252,13 +359,19 @@ def _create_job(app: Flask, payload: Dict[str, object]) -> str:
     job_name = f"{title} ({action})"
     job_type = "translate" if mode == "translate_existing" else "transcribe"
     job_id = _create_job_record(app, job_type=job_type, name=job_name)
-    thread = threading.Thread(target=_run_generate_job, args=(app, job_id, payload), daemon=True)
-    thread.start()
+    try:
+        future = app.config["JOB_EXECUTOR"].submit(_run_generate_job, app, job_id, payload)
+    except BaseException as exc:
+        # submit raises RuntimeError once _shutdown_jobs has run; the slot would otherwise never come back.
+        slots.release()
+        _update_job(app, job_id, status="failed", stage="error", error=str(exc), message="Failed")
+        raise
+    future.add_done_callback(lambda _: slots.release())
     return job_id
 
 
 def _create_job_record(app: Flask, job_type: str, name: str) -> str:
-    job_id = str(uuid.uuid4())
+    job_id = secrets.token_hex(16)
     job = {
         "id": job_id,
         "type": job_type,
@@ -281,24 +394,37 @@ def _create_job_record(app: Flask, job_type: str, name: str) -> str:
 
 
 def _update_job(app: Flask, job_id: str, **kwargs: object) -> None:
-    with app.config["JOB_LOCK"]:
-        job = app.config["JOBS"].get(job_id)
-        if not job:
-            return
-        job.update(kwargs)
-        job["updated_at"] = int(time.time())
+    # Only the owning worker updates a job, and a single dict.update is atomic under the GIL, so the
+    # progress hot path skips JOB_LOCK; the lock only guards insert/delete and the cancel transition.
+    job = app.config["JOBS"].get(job_id)
+    if job:
+        job.update(kwargs, updated_at=int(time.time()))
 
 
 def _is_cancel_requested(app: Flask, job_id: str) -> bool:
-    with app.config["JOB_LOCK"]:
-        job = app.config["JOBS"].get(job_id)
-        return bool(job and job.get("cancel_requested"))
+    job = app.config["JOBS"].get(job_id)
+    return bool(job and job.get("cancel_requested"))
 
 
 def _finish_canceled(app: Flask, job_id: str) -> None:
     _update_job(app, job_id, status="canceled", stage="canceled", message="Canceled")
 
 
+def _shutdown_jobs(app: Flask) -> None:
+    # Executor workers are joined at interpreter exit; drop queued jobs and ask running ones to stop
+    # so that exit does not wait for a whole transcription.
+    with app.config["JOB_LOCK"]:
+        if app.config["JOBS_SHUT_DOWN"]:
+            return
+        app.config["JOBS_SHUT_DOWN"] = True
+    for key in ("JOB_EXECUTOR", "SCAN_EXECUTOR"):
+        app.config[key].shutdown(wait=False, cancel_futures=True)
+    with app.config["JOB_LOCK"]:
+        for job in app.config["JOBS"].values():
+            if job.get("status") in {"queued", "running"}:
+                job["cancel_requested"] = True
+
+
 def _run_generate_job(app: Flask, job_id: str, payload: Dict[str, object]) -> None:
     try:
         _update_job(app, job_id, status="running", stage="init", message="Preparing job")
@@ -340,7 +466,7 @@ def _generate_outputs(app: Flask, payload: Dict[str, object], job_id: str) -> Di
     if not media_path:
         raise ValueError("Missing media_path")
 
-    media = describe_media(Path(media_path))
+    media = describe_media_cached(Path(media_path))
     output_dir = Path(media_path).parent
     stem = Path(media_path).stem
 
@@ -364,17 +490,19 @@ def _generate_outputs(app: Flask, payload: Dict[str, object], job_id: str) -> Di
             translate_provider=translate_provider,
             anthropic_model=anthropic_model,
             anthropic_max_parallel=anthropic_max_parallel,
-            progress_callback=lambda progress: _update_job(
-                app,
-                job_id,
-                stage=str(progress.get("stage", "translate")),
-                message="Translating existing subtitles",
-                progress_current=int(progress.get("processed_segments", 0)),
-                progress_total=int(progress.get("total_segments", 0)),
-                progress_percent=_percent(
-                    int(progress.get("processed_segments", 0)),
-                    int(progress.get("total_segments", 0)),
-                ),
+            progress_callback=_throttled(
+                lambda progress: _update_job(
+                    app,
+                    job_id,
+                    stage=str(progress.get("stage", "translate")),
+                    message="Translating existing subtitles",
+                    progress_current=int(progress.get("processed_segments", 0)),
+                    progress_total=int(progress.get("total_segments", 0)),
+                    progress_percent=_percent(
+                        int(progress.get("processed_segments", 0)),
+                        int(progress.get("total_segments", 0)),
+                    ),
+                )
             ),
             should_cancel=should_cancel,
         )
@@ -388,26 +516,29 @@ def _generate_outputs(app: Flask, payload: Dict[str, object], job_id: str) -> Di
         app.config["STT_ENDPOINT"],
         source_lang,
         vad_threshold=float(app.config.get("VAD_THRESHOLD", 0.30)),
-        progress_callback=lambda progress: _update_job(
-            app,
-            job_id,
-            stage=str(progress.get("stage", "transcribe")),
-            message=(
-                f"Transcribing chunk {int(progress.get('chunk_index', 0))}"
-                + (
-                    f"/{int(progress.get('total_chunks', 0))}"
-                    if int(progress.get("total_chunks", 0)) > 0
-                    else ""
-                )
-            ),
-            progress_current=int(progress.get("chunk_index", 0)),
-            progress_total=int(progress.get("total_chunks", 0)),
-            progress_percent=int(progress.get("progress_percent", 0)),
+        stt_max_parallel=int(app.config.get("STT_MAX_PARALLEL", 4)),
+        progress_callback=_throttled(
+            lambda progress: _update_job(
+                app,
+                job_id,
+                stage=str(progress.get("stage", "transcribe")),
+                message=(
+                    f"Transcribing chunk {int(progress.get('chunk_index', 0))}"
+                    + (
+                        f"/{int(progress.get('total_chunks', 0))}"
+                        if int(progress.get("total_chunks", 0)) > 0
+                        else ""
+                    )
+                ),
+                progress_current=int(progress.get("chunk_index", 0)),
+                progress_total=int(progress.get("total_chunks", 0)),
+                progress_percent=int(progress.get("progress_percent", 0)),
+            )
         ),
         should_cancel=should_cancel,
     )
     source_output = output_path_for(source_lang)
-    source_output.write_text(format_srt(segments), encoding="utf-8")
+    write_srt(source_output, segments)
 
     outputs = [str(source_output)]
     if target_lang != source_lang:
@@ -419,31 +550,62 @@ def _generate_outputs(app: Flask, payload: Dict[str, object], job_id: str) -> Di
             source_lang=source_lang,
             anthropic_model=anthropic_model,
             anthropic_max_parallel=anthropic_max_parallel,
-            progress_callback=lambda progress: _update_job(
-                app,
-                job_id,
-                stage=str(progress.get("stage", "translate")),
-                message="Translating subtitles",
-                progress_current=int(progress.get("processed_segments", 0)),
-                progress_total=int(progress.get("total_segments", 0)),
-                progress_percent=_percent(
-                    int(progress.get("processed_segments", 0)),
-                    int(progress.get("total_segments", 0)),
-                ),
+            progress_callback=_throttled(
+                lambda progress: _update_job(
+                    app,
+                    job_id,
+                    stage=str(progress.get("stage", "translate")),
+                    message="Translating subtitles",
+                    progress_current=int(progress.get("processed_segments", 0)),
+                    progress_total=int(progress.get("total_segments", 0)),
+                    progress_percent=_percent(
+                        int(progress.get("processed_segments", 0)),
+                        int(progress.get("total_segments", 0)),
+                    ),
+                )
             ),
             should_cancel=should_cancel,
         )
         target_output = output_path_for(target_lang)
-        target_output.write_text(format_srt(translated), encoding="utf-8")
+        write_srt(target_output, translated)
         outputs.append(str(target_output))
 
     return {"outputs": outputs}
 
 
+def _throttled(
+    callback: Callable[[Dict[str, object]], None],
+    min_interval: float = PROGRESS_MIN_INTERVAL,
+) -> Callable[[Dict[str, object]], None]:
+    # Transcribe/translate/scan report per chunk, segment or file; publish at most every min_interval
+    # seconds, but never drop a stage change or the final (current == total) update.
+    state: Dict[str, object] = {"at": 0.0, "stage": None}
+
+    def publish(progress: Dict[str, object]) -> None:
+        now = time.monotonic()
+        stage = progress.get("stage")
+        if stage == state["stage"] and now - float(state["at"]) < min_interval and not _progress_done(progress):
+            return
+        state["at"] = now
+        state["stage"] = stage
+        callback(progress)
+
+    return publish
+
+
+def _progress_done(progress: Dict[str, object]) -> bool:
+    for current_key, total_key in _PROGRESS_KEYS:
+        total = progress.get(total_key)
+        if total and progress.get(current_key) == total:
+            return True
+    return False
+
+
 def _percent(current: int, total: int) -> int:
     if total <= 0:
         return 0
-    return int(max(0, min(100, (current * 100) // total)))
+    percent = (current * 100) // total
+    return 0 if percent < 0 else 100 if percent > 100 else percent
 
 
 def _startup_index_path(base_dir: str, index_path: Optional[str]) -> Path:
@@ -463,8 +625,7 @@ def _start_scan(app: Flask, full_scan: bool) -> None:
                 return
     scan_name = "Media library scan (full)" if full_scan else "Media library scan (delta)"
     job_id = _create_job_record(app, job_type="scan", name=scan_name)
-    thread = threading.Thread(target=_scan_worker, args=(app, job_id, full_scan), daemon=True)
-    thread.start()
+    app.config["SCAN_EXECUTOR"].submit(_scan_worker, app, job_id, full_scan)
 
 
 def _scan_worker(app: Flask, job_id: str, full_scan: bool) -> None:
@@ -474,7 +635,9 @@ def _scan_worker(app: Flask, job_id: str, full_scan: bool) -> None:
 
     def on_progress(progress: Dict[str, object]) -> None:
         current = int(progress.get("scanned_files", 0))
-        total = int(progress.get("total_files", 0))
+        # While the walk is still running only a provisional total (files found so far) is known.
+        total = int(progress.get("total_files") or 0)
+        walked = int(progress.get("walked_files") or 0)
         videos = int(progress.get("scanned_videos", 0))
         current_file = str(progress.get("current_file", ""))
         _update_job(
@@ -482,31 +645,32 @@ def _scan_worker(app: Flask, job_id: str, full_scan: bool) -> None:
             job_id,
             stage="scan",
             message=(
-                f"Scanning ({mode}) {current}/{total or '?'} files, videos found: {videos}, "
+                f"Scanning ({mode}) {current}/{total or f'{walked}+'} files, videos found: {videos}, "
                 f"latest: {Path(current_file).name}"
             ),
             progress_current=current,
-            progress_total=total,
-            progress_percent=_percent(current, total),
+            progress_total=total or walked,
+            progress_percent=_percent(current, total or walked),
         )
 
     try:
         items = scan_media_with_index(
             app.config["BASE_DIR"],
             full_scan=full_scan,
-            progress_callback=on_progress,
+            progress_callback=_throttled(on_progress),
             should_cancel=lambda: _is_cancel_requested(app, job_id),
             seed_items=app.config.get("MEDIA_CACHE", []),
             persist_on_full=False,
-            index_path=app.config.get("INDEX_PATH"),
+            index_path=app.config["INDEX_PATH_RESOLVED"],
         )
         app.config["MEDIA_CACHE"] = items
+        app.config["MEDIA_CACHE_VERSION"] += 1
         if full_scan:
             save_media_index(
                 app.config["BASE_DIR"],
                 items,
                 async_write=True,
-                index_path=app.config.get("INDEX_PATH"),
+                index_path=app.config["INDEX_PATH_RESOLVED"],
             )
         print(f"[subgen] scan complete ({mode}): {len(items)} items")
         _update_job(
@@ -527,19 +691,14 @@ def _scan_worker(app: Flask, job_id: str, full_scan: bool) -> None:
         _update_job(app, job_id, status="failed", stage="error", error=str(exc), message="Scan failed")
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Subgen web UI server.")
-    parser.add_argument("--media-dir", default=None, help="Base media directory to scan.")
-    parser.add_argument("--endpoint", default=None, help="STT server endpoint.")
-    parser.add_argument("--host", default="0.0.0.0", help="Listen host.")
-    parser.add_argument("--port", type=int, default=8080, help="Listen port.")
-    args = parser.parse_args()
-
+def wsgi_app(media_dir: Optional[str] = None, endpoint: Optional[str] = None) -> Flask:
+    # Factory for external WSGI servers, e.g. gunicorn -w 1 -k gthread --threads 8 "subgen.web:wsgi_app()".
     config = load_config()
-    media_dir = args.media_dir or config.get("media_dir") or "/agent/workspace/media_test"
-    endpoint = args.endpoint or config.get("stt_endpoint") or "https://stt.rtek.dev"
+    media_dir = media_dir or config.get("media_dir") or "/agent/workspace/media_test"
+    endpoint = endpoint or config.get("stt_endpoint") or "https://stt.rtek.dev"
     index_path = config.get("index_path")
     vad_threshold = float(config.get("vad_threshold") or 0.30)
+    stt_max_parallel = int(config.get("stt_max_parallel") or 4)
     translate_provider_default = str(config.get("translate_provider_default") or "google")
     anthropic_model = str(config.get("anthropic_model") or "claude-3-5-sonnet-latest")
     anthropic_max_parallel = int(config.get("anthropic_max_parallel") or 5)
@@ -554,7 +713,7 @@ def main() -> int:
     print(
         "[subgen] config values: "
         f"media_dir={media_dir} stt_endpoint={endpoint} index_path={index_path or 'media_dir/subgen.json'} "
-        f"vad_threshold={vad_threshold:.2f} "
+        f"vad_threshold={vad_threshold:.2f} stt_max_parallel={stt_max_parallel} "
         f"translate_provider_default={translate_provider_default} anthropic_model={anthropic_model} "
         f"anthropic_max_parallel={anthropic_max_parallel}"
     )
@@ -567,7 +726,44 @@ def main() -> int:
     app.config["TRANSLATE_PROVIDER_DEFAULT"] = translate_provider_default
     app.config["ANTHROPIC_MODEL"] = anthropic_model
     app.config["ANTHROPIC_MAX_PARALLEL"] = anthropic_max_parallel
-    app.run(host=args.host, port=args.port)
+    app.config["STT_MAX_PARALLEL"] = stt_max_parallel
+    return app
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Subgen web UI server.")
+    parser.add_argument("--media-dir", default=None, help="Base media directory to scan.")
+    parser.add_argument("--endpoint", default=None, help="STT server endpoint.")
+    parser.add_argument("--host", default="0.0.0.0", help="Listen host.")
+    parser.add_argument("--port", type=int, default=8080, help="Listen port.")
+    parser.add_argument("--prod", action="store_true", help="Serve with waitress instead of the Flask dev server.")
+    parser.add_argument("--threads", type=int, default=8, help="Request threads for --prod.")
+    args = parser.parse_args()
+
+    if args.prod:
+        try:
+            from waitress import serve
+        except ImportError:
+            print("[subgen] --prod requires waitress (pip install waitress)", file=sys.stderr)
+            return 1
+
+    app = wsgi_app(media_dir=args.media_dir, endpoint=args.endpoint)
+    try:
+        if args.prod:
+            # Jobs and the media cache live in this process, so scale with threads rather than workers.
+            print(f"[subgen] serving with waitress threads={args.threads}")
+            serve(
+                app,
+                host=args.host,
+                port=args.port,
+                threads=max(1, args.threads),
+                connection_limit=200,
+                channel_timeout=30,
+            )
+        else:
+            app.run(host=args.host, port=args.port, threaded=True)
+    finally:
+        _shutdown_jobs(app)
     return 0
 
 
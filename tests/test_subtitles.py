@@ -0,0 +1,40 @@
+import mmap
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from subgen.subtitles import parse_srt, read_subtitle_text
+
+
+class ReadSubtitleTextTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.dir = Path(self._tmp.name)
+
+    def test_empty_file(self) -> None:
+        path = self.dir / "empty.srt"
+        path.write_bytes(b"")
+        self.assertEqual(read_subtitle_text(path), "")
+
+    def test_falls_back_when_mmap_is_unsupported(self) -> None:
+        path = self.dir / "cue.srt"
+        path.write_bytes(b"1\n00:00:01,000 --> 00:00:02,000\nHi \xff\n")
+        with mock.patch.object(mmap, "mmap", side_effect=OSError(19, "No such device")):
+            self.assertEqual(read_subtitle_text(path), "1\n00:00:01,000 --> 00:00:02,000\nHi \n")
+            with self.assertRaises(UnicodeDecodeError):
+                read_subtitle_text(path, errors="strict")
+
+
+class ParseSrtTests(unittest.TestCase):
+    def test_index_line_is_optional(self) -> None:
+        text = "a\n00:00:01,000 --> 00:00:02,000\nA\n\n00:00:03,000 --> 00:00:04,500\nB\n"
+        self.assertEqual(
+            parse_srt(text),
+            [{"start": 1.0, "end": 2.0, "text": "A"}, {"start": 3.0, "end": 4.5, "text": "B"}],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()